@@ -0,0 +1,161 @@
+"""Headless batch analysis: run the CV analysis (and optionally questions) over many extracted CVs.
+
+Each CV gets a status file under --status-dir. Re-running skips CVs whose
+status file says they are finished, and resumes CVs that were analyzed but
+still need questions. LLM calls across all CVs share one concurrency limit.
+
+Usage:
+    python batch_analyze.py "resume/cv*_extracted.txt" --questions
+    python batch_analyze.py --from-manifest data/ingest_manifest.jsonl --max-concurrent-calls 20
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+# Load environment variables before modules that read their configuration at import
+load_dotenv()
+
+from cv_analyzer import VERBOSITY_TIERS, AsyncCVAnalyzer, ensure_prompt_files  # noqa: E402
+from llm_metrics import shared_llm_metrics  # noqa: E402
+from progress import ConsoleProgressReporter  # noqa: E402
+
+EXTRACTED_CV_NAME = re.compile(r"^cv(?P<session_id>[^_]+)_extracted\.txt$")
+
+
+def find_cvs(inputs, manifest_path=None):
+    """(cv_path, session_id) for extracted CV files from glob patterns and/or an ingest manifest"""
+    cv_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "cv*_extracted.txt")
+        cv_paths.extend(sorted(glob.glob(pattern)))
+    if manifest_path:
+        with open(manifest_path, "r", encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") in ("done", "truncated"):
+                    cv_paths.append(record["extracted_cv_path"])
+    jobs = {}
+    for cv_path in cv_paths:
+        # Reuse the upload/ingest session id so results line up with the extracted file
+        match = EXTRACTED_CV_NAME.match(os.path.basename(cv_path))
+        session_id = match.group("session_id") if match else str(uuid.uuid4())[:8]
+        jobs[os.path.abspath(cv_path)] = session_id
+    return sorted(jobs.items())
+
+
+class JobStatus:
+    """Per-CV status file, rewritten atomically on every change"""
+
+    def __init__(self, status_dir, cv_path, session_id):
+        self.path = os.path.join(status_dir, f"{session_id}.json")
+        self.data = {"cv_path": cv_path, "session_id": session_id, "status": "pending"}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    def update(self, **fields):
+        self.data.update(fields, updated_at=time.time())
+        with open(self.path + ".tmp", "w", encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+
+
+async def run_job(analyzer, job_slots, status, with_questions, verbosity):
+    """Analyze one CV, then generate its questions if requested, recording each step"""
+    session_id = status.data["session_id"]
+    progress = ConsoleProgressReporter(session_id)
+    async with job_slots:
+        start_time = time.perf_counter()
+        try:
+            if status.data["status"] not in ("analyzed", "done"):
+                status.update(status="analyzing", error=None)
+                results = await analyzer.analyze_cv(status.data["cv_path"], session_id, progress,
+                                                    verbosity=verbosity)
+                status.update(status="analyzed", analysis_path=results["final_file_path"])
+            if with_questions and status.data["status"] != "done":
+                status.update(status="generating_questions")
+                await analyzer.generate_questions(status.data["cv_path"], status.data["analysis_path"],
+                                                  session_id, progress, verbosity=verbosity)
+                status.update(questions_path=os.path.join("data", f"{session_id}_questions.txt"))
+            status.update(status="done", seconds=round(time.perf_counter() - start_time, 3))
+        except Exception as e:
+            status.update(status="failed", error=str(e))
+            print(f"[{session_id}] failed: {e}", flush=True)
+    return status.data["status"]
+
+
+async def run_batch(args):
+    """Run every unfinished job with bounded CV and LLM call concurrency"""
+    analyzer = AsyncCVAnalyzer(gpt_model=args.model, max_concurrent_calls=args.max_concurrent_calls)
+    # Rate-limit responses are retried with the client's backoff, honouring Retry-After
+    analyzer.client = analyzer.client.with_options(max_retries=args.max_retries)
+    analyzer.llm_cache.bypass = analyzer.llm_cache.bypass or args.no_llm_cache
+    job_slots = asyncio.Semaphore(max(1, args.max_concurrent_cvs))
+
+    # Step 1: Load job states and skip finished ones
+    jobs = []
+    skipped = 0
+    for cv_path, session_id in find_cvs(args.inputs, args.from_manifest):
+        status = JobStatus(args.status_dir, cv_path, session_id)
+        finished = status.data["status"] == "done" or (status.data["status"] == "analyzed" and not args.questions)
+        if finished or (status.data["status"] == "failed" and not args.retry_failed):
+            skipped += 1
+            continue
+        jobs.append(status)
+    print(f"{len(jobs) + skipped} CVs found, {skipped} skipped, {len(jobs)} to run")
+
+    # Step 2: Run them; the analyzer's call semaphore keeps the LLM within its limit
+    start_time = time.perf_counter()
+    outcomes = await asyncio.gather(*(run_job(analyzer, job_slots, status, args.questions, args.verbosity)
+                                      for status in jobs))
+    seconds = time.perf_counter() - start_time
+    counts = {outcome: outcomes.count(outcome) for outcome in set(outcomes)}
+    summary = ", ".join(f"{outcome}={count}" for outcome, count in sorted(counts.items()))
+    print(f"Finished {len(jobs)} CVs in {seconds:.1f}s ({summary})")
+    for site, counters in sorted(analyzer.llm_cache.stats()["sites"].items()):
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        print(f"LLM cache {site}: {hits} hits, {counters['misses'] + counters['bypassed']} calls")
+    for site, totals in sorted(shared_llm_metrics().stats()["sites"].items()):
+        print(f"Prompt cache {site}: {totals['cached_ratio']:.0%} of {totals['prompt_tokens']} prompt tokens cached")
+        if totals["hedged"] or totals["timeouts"]:
+            print(f"Hedging {site}: {totals['hedged']} of {totals['calls']} calls hedged, "
+                  f"{totals['hedge_wins']} won by the hedge, {totals['timeouts']} timed out")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CV analysis over a batch of extracted CVs")
+    parser.add_argument("inputs", nargs="*", help="Extracted CV files, directories or glob patterns")
+    parser.add_argument("--from-manifest", help="Also take finished CVs from an ingest_pdfs.py manifest")
+    parser.add_argument("--questions", action="store_true", help="Generate interview questions after analysis")
+    parser.add_argument("--model", default="o1-mini")
+    parser.add_argument("--verbosity", choices=list(VERBOSITY_TIERS), default="standard",
+                        help="Output detail of the analysis and questions")
+    parser.add_argument("--max-concurrent-calls", type=int,
+                        default=int(os.getenv("OPENAI_MAX_CONCURRENT_CALLS", "100")),
+                        help="LLM calls in flight across all CVs")
+    parser.add_argument("--max-concurrent-cvs", type=int, default=25, help="CVs in progress at once")
+    parser.add_argument("--max-retries", type=int, default=6, help="Client retries on rate limits and errors")
+    parser.add_argument("--status-dir", default=os.path.join("data", "batch"))
+    parser.add_argument("--retry-failed", action="store_true", help="Also rerun CVs whose last run failed")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Call the LLM even for previously seen requests")
+    args = parser.parse_args()
+    if not args.inputs and not args.from_manifest:
+        parser.error("give extracted CV paths/patterns or --from-manifest")
+    os.makedirs(args.status_dir, exist_ok=True)
+    ensure_prompt_files()
+    asyncio.run(run_batch(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Performance benchmarks for the CV Analyzer extraction pipeline.
+
+Usage:
+    python benchmark.py pages resume/sample.pdf --pages 5 10 20 40 --workers 4
+    python benchmark.py memory resume/sample.pdf --pages 50 100
+    python benchmark.py backends "resume/corpus/*.pdf"
+    python benchmark.py tables "resume/corpus/*.pdf"
+    python benchmark.py startup main cv_analyzer streamlit_app --runs 5
+"""
+import argparse
+import asyncio
+import glob
+import io
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+import tempfile
+import time
+import tracemalloc
+
+import PyPDF2
+
+from pdf_reader import (
+    BACKEND_FALLBACKS,
+    PAGE_ITERATORS,
+    PDF_EXTRACTION_BACKEND,
+    clean_and_format_text,
+    count_pdf_pages,
+    format_pdfplumber_page,
+    iter_pdfplumber_pages,
+    write_clean_text,
+)
+from pdf_extraction import PDFExtractionEngine
+
+
+def build_pdf_with_page_count(source_pdf, page_count, output_path):
+    """Write a PDF with page_count pages by cycling through the pages of source_pdf"""
+    reader = PyPDF2.PdfReader(source_pdf)
+    writer = PyPDF2.PdfWriter()
+    for i in range(page_count):
+        writer.add_page(reader.pages[i % len(reader.pages)])
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def read_pdf_with_pdfplumber(pdf_file):
+    """Read PDF using pdfplumber - better formatting and table extraction"""
+    try:
+        return "".join(iter_pdfplumber_pages(pdf_file))
+    except Exception as e:
+        print(f"Error reading PDF with pdfplumber: {e}")
+        return None
+
+
+def time_engine_extraction(engine, pdf_path, output_path):
+    """(seconds, text) of one PDFExtractionEngine.extract run; the pool is started before timing"""
+    engine.start()
+    start_time = time.perf_counter()
+    asyncio.run(engine.extract(pdf_path, output_path))
+    seconds = time.perf_counter() - start_time
+    with open(output_path, "r", encoding='utf-8') as f:
+        return seconds, f.read()
+
+
+def benchmark_pages(args):
+    """Whole-document vs page-range parallel extraction through PDFExtractionEngine against page count
+
+    Both runs go through the engine's sandboxed jobs with the configured
+    backend; the serial engine has one worker, so it never splits the PDF.
+    """
+    print(f"{'pages':>6} {'serial s':>10} {'parallel s':>11} {'speedup':>8} {'identical':>10}")
+    serial_engine = PDFExtractionEngine(max_workers=1)
+    parallel_engine = PDFExtractionEngine(max_workers=args.workers)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for page_count in args.pages:
+                pdf_path = os.path.join(tmp_dir, f"bench_{page_count}.pdf")
+                build_pdf_with_page_count(args.pdf, page_count, pdf_path)
+                serial_seconds, serial_text = time_engine_extraction(
+                    serial_engine, pdf_path, os.path.join(tmp_dir, f"serial_{page_count}.txt"))
+                parallel_seconds, parallel_text = time_engine_extraction(
+                    parallel_engine, pdf_path, os.path.join(tmp_dir, f"parallel_{page_count}.txt"))
+                print(f"{page_count:>6} {serial_seconds:>10.2f} {parallel_seconds:>11.2f} "
+                      f"{serial_seconds / parallel_seconds:>7.2f}x {str(serial_text == parallel_text):>10}")
+    finally:
+        serial_engine.shutdown()
+        parallel_engine.shutdown()
+
+
+def extract_pdf_to_file(pdf_file, output_path, backend=PDF_EXTRACTION_BACKEND, stats=None):
+    """Stream a PDF page by page into cleaned text at output_path
+
+    Tries the configured backend first and falls back along BACKEND_FALLBACKS,
+    with PyPDF2 as the last resort. Only one page plus the output buffer is
+    held in memory. Returns the characters written and the backend used.
+    """
+    for fallback in BACKEND_FALLBACKS[backend]:
+        if isinstance(pdf_file, io.IOBase):
+            pdf_file.seek(0)
+        try:
+            characters = write_clean_text(PAGE_ITERATORS[fallback](pdf_file, stats=stats), output_path, stats)
+        except Exception as e:
+            print(f"Error reading PDF with {fallback}: {e}")
+            continue
+        if characters:
+            return {"characters": characters, "backend": fallback}
+    return {"characters": 0, "backend": None}
+
+
+def extract_in_memory(pdf_path, output_path):
+    """Whole-document pipeline: full raw text, then full cleaned text, then one write"""
+    cleaned_text = clean_and_format_text(read_pdf_with_pdfplumber(pdf_path))
+    with open(output_path, "w", encoding='utf-8') as f:
+        f.write(cleaned_text)
+
+
+def extract_streaming(pdf_path, output_path):
+    """Page-by-page pipeline writing cleaned lines straight to disk"""
+    extract_pdf_to_file(pdf_path, output_path, backend="pdfplumber")
+
+
+def measure(func, *args):
+    """(seconds, peak traced MB) of func(*args); timing is taken from an untraced run"""
+    start_time = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start_time
+    tracemalloc.start()
+    func(*args)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak_bytes / (1024 * 1024)
+
+
+def benchmark_memory(args):
+    """Peak memory and time of in-memory vs streaming text assembly"""
+    print(f"{'pages':>6} {'pipeline':>10} {'seconds':>8} {'peak MB':>8} {'identical':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for page_count in args.pages:
+            pdf_path = os.path.join(tmp_dir, f"bench_{page_count}.pdf")
+            build_pdf_with_page_count(args.pdf, page_count, pdf_path)
+            outputs = {}
+            for name, func in (("in-memory", extract_in_memory), ("streaming", extract_streaming)):
+                outputs[name] = os.path.join(tmp_dir, f"{name}_{page_count}.txt")
+                seconds, peak_mb = measure(func, pdf_path, outputs[name])
+                with open(outputs[name], "r", encoding='utf-8') as f, \
+                        open(outputs["in-memory"], "r", encoding='utf-8') as reference:
+                    identical = f.read() == reference.read()
+                print(f"{page_count:>6} {name:>10} {seconds:>8.2f} {peak_mb:>8.1f} {str(identical):>10}")
+
+
+def word_parity(text, reference):
+    """Share of reference words (as a multiset) that also appear in text"""
+    words = Counter(re.findall(r"\w+", text.lower()))
+    reference_words = Counter(re.findall(r"\w+", reference.lower()))
+    total = sum(reference_words.values())
+    if not total:
+        return 1.0 if not words else 0.0
+    return sum((words & reference_words).values()) / total
+
+
+def benchmark_backends(args):
+    """Pages/sec and output parity (vs pdfplumber) of each extraction backend over a corpus"""
+    pdf_paths = sorted(path for pattern in args.corpus for path in glob.glob(pattern))
+    if not pdf_paths:
+        raise SystemExit("No PDFs matched the corpus pattern")
+    backends = ["pdfium", "tiered", "pdfplumber", "pypdf2"]
+    totals = {backend: {"seconds": 0.0, "parity": 0.0, "stats": Counter()} for backend in backends}
+    page_count = 0
+    for pdf_path in pdf_paths:
+        page_count += count_pdf_pages(pdf_path)
+        outputs = {}
+        for backend in backends:
+            stats = {}
+            start_time = time.perf_counter()
+            outputs[backend] = clean_and_format_text("".join(PAGE_ITERATORS[backend](pdf_path, stats=stats)))
+            totals[backend]["seconds"] += time.perf_counter() - start_time
+            totals[backend]["stats"].update(stats)
+        for backend in backends:
+            totals[backend]["parity"] += word_parity(outputs[backend], outputs["pdfplumber"])
+    print(f"{len(pdf_paths)} PDFs, {page_count} pages")
+    print(f"{'backend':>10} {'seconds':>8} {'pages/s':>8} {'parity':>7}  page counters")
+    for backend in backends:
+        seconds = totals[backend]["seconds"]
+        parity = totals[backend]["parity"] / len(pdf_paths)
+        counters = ", ".join(f"{name}={value}" for name, value in sorted(totals[backend]["stats"].items()))
+        print(f"{backend:>10} {seconds:>8.2f} {page_count / seconds:>8.1f} {parity:>6.1%}  {counters}")
+
+
+def extract_with_table_mode(pdf_path, tables, stats):
+    """pdfplumber text of every page with the given table mode ("always" or "auto")"""
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        return "".join(format_pdfplumber_page(page, page.page_number, stats, tables) for page in pdf.pages)
+
+
+def table_stage_seconds(stats):
+    """Seconds spent deciding on and finding tables: the pre-check plus pdfplumber's table finder"""
+    return stats.get("table_precheck_seconds", 0.0) + stats.get("table_extraction_seconds", 0.0)
+
+
+def benchmark_tables(args):
+    """Table-finding time with and without the geometry pre-check, measured on the same pages
+
+    Only the table stage is timed; whole-page times are dominated by layout
+    parsing, which both modes share.
+    """
+    pdf_paths = sorted(path for pattern in args.corpus for path in glob.glob(pattern))
+    if not pdf_paths:
+        raise SystemExit("No PDFs matched the corpus pattern")
+    print(f"{'pdf':>24} {'pages':>6} {'skipped':>8} {'always s':>9} {'auto s':>8} {'saved s':>8} {'identical':>10}")
+    totals = Counter()
+    for pdf_path in pdf_paths:
+        stats = {"always": {}, "auto": {}}
+        outputs = {mode: extract_with_table_mode(pdf_path, mode, stats[mode]) for mode in stats}
+        seconds = {mode: table_stage_seconds(stats[mode]) for mode in stats}
+        skipped = stats["auto"].get("table_pages_skipped", 0)
+        pages = stats["always"].get("table_pages_extracted", 0)
+        totals.update({"pages": pages, "skipped": skipped})
+        totals.update({f"{mode}_seconds": seconds[mode] for mode in seconds})
+        print(f"{os.path.basename(pdf_path)[-24:]:>24} {pages:>6} {skipped:>8} {seconds['always']:>9.4f} "
+              f"{seconds['auto']:>8.4f} {seconds['always'] - seconds['auto']:>8.4f} "
+              f"{str(outputs['always'] == outputs['auto']):>10}")
+    print(f"{'total':>24} {totals['pages']:>6} {totals['skipped']:>8} {totals['always_seconds']:>9.4f} "
+          f"{totals['auto_seconds']:>8.4f} {totals['always_seconds'] - totals['auto_seconds']:>8.4f}")
+
+
+# Run in a fresh interpreter: prints import seconds and resident set size in MB
+IMPORT_PROBE = """
+import sys, time
+start_time = time.perf_counter()
+__import__(sys.argv[1])
+seconds = time.perf_counter() - start_time
+with open("/proc/self/status") as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(seconds, rss_kb / 1024)
+"""
+
+
+def benchmark_startup(args):
+    """Cold import time and resident memory of each entry-point module, median over fresh interpreters"""
+    print(f"{'module':>16} {'seconds':>8} {'RSS MB':>8}")
+    for module in args.modules:
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, "-c", IMPORT_PROBE, module], capture_output=True,
+                                    text=True, check=True).stdout
+            samples.append([float(value) for value in output.split()])
+        seconds = statistics.median(sample[0] for sample in samples)
+        rss_mb = statistics.median(sample[1] for sample in samples)
+        print(f"{module:>16} {seconds:>8.3f} {rss_mb:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CV Analyzer performance benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pages_parser = subparsers.add_parser("pages", help="Engine speedup from parallel page ranges vs page count")
+    pages_parser.add_argument("pdf", help="Source PDF; its pages are repeated to reach each page count")
+    pages_parser.add_argument("--pages", type=int, nargs="+", default=[5, 10, 20, 40])
+    pages_parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    pages_parser.set_defaults(func=benchmark_pages)
+
+    memory_parser = subparsers.add_parser("memory", help="Peak memory of in-memory vs streaming text assembly")
+    memory_parser.add_argument("pdf", help="Source PDF; its pages are repeated to reach each page count")
+    memory_parser.add_argument("--pages", type=int, nargs="+", default=[50, 100])
+    memory_parser.set_defaults(func=benchmark_memory)
+
+    backends_parser = subparsers.add_parser(
+        "backends", help="Throughput and output parity of pdfium, tiered, pdfplumber and PyPDF2"
+    )
+    backends_parser.add_argument("corpus", nargs="+", help="PDF paths or glob patterns")
+    backends_parser.set_defaults(func=benchmark_backends)
+
+    tables_parser = subparsers.add_parser(
+        "tables", help="Time saved by the table pre-check (PDF_TABLE_EXTRACTION=auto vs always)"
+    )
+    tables_parser.add_argument("corpus", nargs="+", help="PDF paths or glob patterns")
+    tables_parser.set_defaults(func=benchmark_tables)
+
+    startup_parser = subparsers.add_parser("startup", help="Import time and memory of the app entry points")
+    startup_parser.add_argument("modules", nargs="*", default=["main", "cv_analyzer", "streamlit_app"])
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.set_defaults(func=benchmark_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
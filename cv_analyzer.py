@@ -0,0 +1,1039 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from llm_cache import cached_completion, completion_key, shared_llm_cache
+from llm_metrics import shared_llm_metrics
+from progress import ProgressReporter
+
+# Prompt files shared by the API, the Streamlit apps and the batch runners
+GENERATE_QUESTIONS_PROMPT_FILE = os.path.join("prompts", "generate_questions_prompt.txt")
+DEFAULT_QUESTIONS_PROMPT = """# Interview Questions Generation
+Based on the CV content and comprehensive analysis, generate targeted interview questions that will help employers assess the candidate effectively.
+## Requirements:
+- Generate questions that test claimed skills and experiences
+- Focus on areas where the CV lacks detail or evidence
+- Include both technical and behavioral questions
+- Provide questions that validate or challenge weak areas identified in the analysis
+- Create questions that allow the candidate to demonstrate their actual capabilities
+## Output Format:
+```
+COMPREHENSIVE INTERVIEW QUESTIONS
+Technical Skills Validation Questions:
+[Generate 8-12 questions that test the technical skills claimed in the CV]
+Experience Verification Questions:
+[Generate 6-10 questions that probe the depth of work experience claims]
+Project Deep-Dive Questions:
+[Generate 5-8 questions that explore project details and technical implementations]
+Behavioral and Soft Skills Questions:
+[Generate 6-8 questions that assess leadership, communication, and problem-solving abilities]
+Gap Analysis Questions:
+[Generate 4-6 questions specifically targeting weak areas or gaps identified in the analysis]
+Scenario-Based Questions:
+[Generate 5-7 situational questions that test practical application of skills]
+Red Flag Investigation Questions:
+[Generate 3-5 questions that address any inconsistencies or concerns from the CV analysis]
+Questions by Difficulty Level:
+ENTRY LEVEL (Easy):
+[3-5 basic questions to establish baseline competency]
+INTERMEDIATE (Medium):
+[5-7 questions that test practical application and experience]
+ADVANCED (Hard):
+[4-6 challenging questions for senior positions or specialist roles]
+Interview Strategy Recommendations:
+- Suggested interview flow and question sequencing
+- Key areas to focus on based on the role level
+- Warning signs to watch for in responses
+- Follow-up question strategies for each major area
+```
+Generate comprehensive questions that will thoroughly evaluate this candidate's actual capabilities versus their CV claims."""
+
+
+def ensure_prompt_files():
+    """Create the prompts directory and the default questions prompt file if missing"""
+    os.makedirs("prompts", exist_ok=True)
+    if not os.path.exists(GENERATE_QUESTIONS_PROMPT_FILE):
+        with open(GENERATE_QUESTIONS_PROMPT_FILE, "w", encoding='utf-8') as f:
+            f.write(DEFAULT_QUESTIONS_PROMPT)
+
+
+def build_enhanced_resume_input(cv_text, analysis_text, qa_data, generate_resume_prompt):
+    """Combine CV, analysis, Q&A responses and the resume prompt into one input
+
+    Inputs put the CV (then the analysis) first and the instructions last, so
+    calls about the same CV share a leading prefix the provider can cache.
+    """
+    # Format Q&A responses
+    qa_text = "\n\nDETAILED QUESTION-ANSWER RESPONSES:\n"
+    for i, (question, answer) in enumerate(qa_data.items(), 1):
+        qa_text += f"\nQ{i}: {question}\nA{i}: {answer}\n"
+    return f"ORIGINAL CV:\n{cv_text}\n\nCOMPREHENSIVE ANALYSIS:\n{analysis_text}{qa_text}\n\n{generate_resume_prompt}"
+
+
+# Section segmentation: each analysis pass reads only the CV sections it needs (opt-in)
+ANALYSIS_SECTION_SLICING = os.getenv('ANALYSIS_SECTION_SLICING', 'false').lower() == 'true'
+# Leading CV text (name, contact details) sent along with every excerpt
+CV_HEADER_MAX_CHARS = 600
+# An excerpt this close to the whole CV is not worth the lost context
+MAX_EXCERPT_SHARE = 0.8
+SECTION_HEADINGS = {
+    'summary': r"(?:professional[ \t]+|career[ \t]+)?(?:summary|profile|objective)|about[ \t]+me",
+    'skills': r"(?:technical[ \t]+|core[ \t]+|key[ \t]+)?(?:skills|competencies)(?:[ \t]+(?:&|and)[ \t]+\w+)?"
+              r"|technologies|tech[ \t]+stack|tools",
+    'experience': r"(?:work|professional|employment|relevant|industry)[ \t]+(?:experience|history)"
+                  r"|experience|employment|career[ \t]+history",
+    'projects': r"(?:key[ \t]+|personal[ \t]+|selected[ \t]+|academic[ \t]+)?projects|portfolio",
+    'education': r"education(?:al[ \t]+background)?|academic[ \t]+(?:background|qualifications)|qualifications",
+    'certifications': r"certifications?|licen[cs]es(?:[ \t]+(?:&|and)[ \t]+certifications?)?|courses|training",
+}
+# A heading is a line holding only a known section name (optionally numbered, "#"-prefixed or ending in ":")
+SECTION_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:#+[ \t]*|\d+\.[ \t]*)?(?:"
+    + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_HEADINGS.items())
+    + r")[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+# Keywords behind detect_cv_structure, compiled once into one pattern per structure flag
+STRUCTURE_KEYWORDS = {
+    'has_skills': [r"technical\s+skills|programming|languages|technologies", r"skills|competenc|proficienc",
+                   r"python|javascript|java|aws|machine\s+learning"],
+    'has_experience': [r"work\s+experience|employment|professional\s+experience",
+                       r"software\s+engineer|developer|lead|manager", r"responsibilities|developed|led|managed"],
+    'has_projects': [r"projects|portfolio|key\s+projects", r"developed\s+a|built\s+a|created\s+a", r"github|portfolio"],
+    'has_education': [r"education|academic|degree|university|college", r"bachelor|master|phd|bs|ms|ba|ma",
+                      r"graduated|graduation"],
+    'has_certifications': [r"certification|certified|credential", r"aws\s+certified|microsoft\s+certified|cisco"],
+}
+STRUCTURE_PATTERNS = {key: re.compile("|".join(patterns), re.IGNORECASE)
+                      for key, patterns in STRUCTURE_KEYWORDS.items()}
+# Structure flag raised by each section heading
+HEADING_STRUCTURE = {
+    'skills': 'has_skills',
+    'experience': 'has_experience',
+    'projects': 'has_projects',
+    'education': 'has_education',
+    'certifications': 'has_certifications',
+}
+# Sections each pass reads, including those its prompt cross-references (skills are validated against
+# experience, projects and education, and so on); passes not listed (integration) get the whole CV
+PASS_SECTIONS = {
+    'skills_analysis': ['skills', 'experience', 'projects', 'education'],
+    'experience_analysis': ['experience', 'skills', 'education'],
+    'projects_analysis': ['projects', 'skills'],
+    'education_analysis': ['education', 'certifications', 'experience'],
+}
+
+
+def segment_cv(cv_text):
+    """Section spans [(name, start, end)] found in one scan for heading lines
+
+    Text before the first heading is the "header" span.
+    """
+    spans = []
+    name, start = "header", 0
+    for match in SECTION_HEADING_PATTERN.finditer(cv_text):
+        spans.append((name, start, match.start()))
+        name, start = match.lastgroup, match.start()
+    spans.append((name, start, len(cv_text)))
+    return [span for span in spans if cv_text[span[1]:span[2]].strip()]
+
+
+def cv_excerpt(cv_text, sections, pass_type):
+    """CV header plus only the sections pass_type reads, or the whole CV when that would not help"""
+    names = PASS_SECTIONS.get(pass_type)
+    if not names:
+        return cv_text
+    parts = [cv_text[start:end].strip() for name, start, end in sections if name in names]
+    if not parts or sum(len(part) for part in parts) >= MAX_EXCERPT_SHARE * len(cv_text):
+        return cv_text
+    header = "".join(cv_text[start:end] for name, start, end in sections if name == "header").strip()
+    note = f"[Excerpt: {', '.join(names).upper()} only; the other CV sections are omitted]"
+    return "\n\n".join(filter(None, [header[:CV_HEADER_MAX_CHARS], note] + parts))
+
+
+# CV Analyzer Class (Based on FastAPI version)
+# Pass checkpoints: a rerun for the same session reuses passes already computed from the same CV, prompt and model
+ANALYSIS_RESUME_CHECKPOINTS = os.getenv('ANALYSIS_RESUME_CHECKPOINTS', 'true').lower() == 'true'
+
+# LLM call deadlines: past the soft deadline (the recent p95 latency of that pass and model) a call gets a
+# duplicate "hedge" request and the first answer wins; past the hard deadline it fails
+LLM_HEDGING = os.getenv('LLM_HEDGING', 'true').lower() == 'true'
+LLM_HEDGE_QUANTILE = float(os.getenv('LLM_HEDGE_QUANTILE', '0.95'))
+# Recent calls of a pass and model needed before its latency quantile is trusted
+LLM_HEDGE_MIN_CALLS = int(os.getenv('LLM_HEDGE_MIN_CALLS', '20'))
+LLM_HARD_TIMEOUT_SECONDS = float(os.getenv('LLM_HARD_TIMEOUT_SECONDS', '600'))
+# With latency history, the hard deadline is this many times the soft one (capped at LLM_HARD_TIMEOUT_SECONDS)
+LLM_HARD_DEADLINE_FACTOR = float(os.getenv('LLM_HARD_DEADLINE_FACTOR', '5'))
+
+# Prompt-cache warm-up (opt-in): analysis passes sharing the CV as a prefix wait up to this long for the
+# first pass's first token, so they hit the provider's prompt cache. Reasoning models stream nothing
+# until they have finished thinking, so their first token says nothing about the cache and they never wait
+PROMPT_CACHE_WARMUP_SECONDS = float(os.getenv('PROMPT_CACHE_WARMUP_SECONDS', '0'))
+REASONING_MODEL_PREFIXES = ("o1", "o3", "o4")
+
+# Completion budgets: max_completion_tokens for a call is a high quantile of the output tokens per input
+# character recently seen for that call site and model, scaled to the input; the fixed limits below are ceilings
+ANALYSIS_COMPLETION_TOKENS = 15000
+MAX_COMPLETION_TOKENS = 65000
+ADAPTIVE_COMPLETION_BUDGETS = os.getenv('ADAPTIVE_COMPLETION_BUDGETS', 'true').lower() == 'true'
+COMPLETION_BUDGET_QUANTILE = float(os.getenv('COMPLETION_BUDGET_QUANTILE', '0.95'))
+COMPLETION_BUDGET_MIN_CALLS = int(os.getenv('COMPLETION_BUDGET_MIN_CALLS', '20'))
+# Margin over the quantile; reasoning models spend part of the budget before any output
+COMPLETION_BUDGET_HEADROOM = float(os.getenv('COMPLETION_BUDGET_HEADROOM', '1.5'))
+COMPLETION_BUDGET_MIN_TOKENS = int(os.getenv('COMPLETION_BUDGET_MIN_TOKENS', '4000'))
+
+# Verbosity tiers: an instruction appended to the prompt and a factor on the completion ceiling
+VERBOSITY_TIERS = {
+    "brief": {
+        "instruction": "Keep the output brief: cover every required section, but only with the most important "
+                       "points, and do not repeat CV content.",
+        "budget_factor": 0.5
+    },
+    "standard": {"instruction": "", "budget_factor": 1.0},
+    "exhaustive": {
+        "instruction": "Be exhaustive: cover every item in full detail with all supporting evidence from the CV.",
+        "budget_factor": 2.0
+    }
+}
+
+
+def tier_site(site, verbosity):
+    """Call site name used for metrics, so each verbosity tier keeps its own latency and output size history"""
+    return site if verbosity == "standard" else f"{site}_{verbosity}"
+
+
+def tier_prompt(prompt, verbosity):
+    """Prompt with the verbosity tier's instruction appended"""
+    instruction = VERBOSITY_TIERS[verbosity]["instruction"]
+    return f"{prompt}\n{instruction}" if instruction else prompt
+
+
+def tier_ceiling(max_completion_tokens, verbosity):
+    """Completion ceiling scaled for the verbosity tier"""
+    return min(MAX_COMPLETION_TOKENS, int(max_completion_tokens * VERBOSITY_TIERS[verbosity]["budget_factor"]))
+
+
+def text_hash(text):
+    """Short SHA-256 hex digest identifying a CV text or prompt version"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def is_transient_llm_error(error):
+    """True if error (or an error it was raised from) is worth retrying: a timeout, rate limit or provider outage"""
+    import openai
+    transient = (TimeoutError, asyncio.TimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                 openai.InternalServerError)
+    while error is not None:
+        if isinstance(error, transient):
+            return True
+        error = error.__cause__
+    return False
+
+
+class CVAnalyzer:
+    # Passes that need the output of earlier passes; every other pass only needs the CV
+    pass_dependencies = {
+        'integration_analysis': ['skills_analysis', 'experience_analysis', 'projects_analysis', 'education_analysis'],
+    }
+    def __init__(self, gpt_model="o1-mini", api_key=os.getenv('OPENAI_API_KEY'),
+                 max_parallel_passes=int(os.getenv('ANALYSIS_MAX_PARALLEL_PASSES', '4')), llm_cache=None):
+        self.gpt_model = gpt_model
+        self.client = self.create_client(api_key or os.getenv("OPENAI_API_KEY"))
+        self.max_parallel_passes = max(1, max_parallel_passes)
+        self.section_slicing = ANALYSIS_SECTION_SLICING
+        self.resume_checkpoints = ANALYSIS_RESUME_CHECKPOINTS
+        # Identical requests (same model, input and parameters) are answered from the cache
+        self.llm_cache = llm_cache or shared_llm_cache()
+        # Load questions prompt from file
+        try:
+            with open(GENERATE_QUESTIONS_PROMPT_FILE, "r", encoding='utf-8') as f:
+                questions_prompt = f.read()
+        except FileNotFoundError:
+            questions_prompt = "Generate comprehensive interview questions based on the CV analysis."
+        self.prompt_templates = {
+            'skills_analysis': """
+# Skills Comprehensive Analysis
+Analyze ONLY the skills section of the provided CV. You must analyze every single skill individually with complete detail. No shortcuts, no placeholders allowed.
+## Requirements:
+- Identify ALL skill categories in the CV
+- Analyze each individual skill with:
+  * Evidence in work experience (specific roles where demonstrated)
+  * Evidence in projects (specific projects using this skill)
+  * Educational foundation support
+  * Proficiency indicators present or absent
+  * Application context from CV
+  * Validation strength assessment
+## Output Format:
+```
+SKILLS COMPREHENSIVE ANALYSIS
+Total Skills Categories: [Count]
+Total Individual Skills: [Count]
+[For each skill category:]
+CATEGORY: [Exact category name from CV]
+SKILL: [Individual skill name]
+CV Location: [Where mentioned]
+Work Evidence: [Specific roles demonstrating this skill or "Not demonstrated"]
+Project Evidence: [Specific projects using this skill or "Not demonstrated"]
+Educational Support: [Academic foundation or "Not established"]
+Proficiency Level: [Any level claimed or "Not specified in CV"]
+Application Context: [How skill is used or "Not specified in CV"]
+Validation Status: [Strong/Moderate/Weak/None with reasoning]
+[Continue for EVERY skill in EVERY category]
+Skills Evidence Summary:
+- Well-Supported Skills: [Count and list]
+- Partially Supported Skills: [Count and list]
+- Unsupported Skills: [Count and list]
+- Missing Industry Standard Tools: [What's absent for experience level]
+```
+Complete this analysis for ALL skills before stopping.
+""",
+            'experience_analysis': """
+# Work Experience Forensic Analysis
+Analyze ONLY the work experience section. You must analyze every position individually with complete responsibility breakdown. No shortcuts allowed.
+## Requirements:
+- Analyze each employment position individually
+- Break down every responsibility statement
+- Identify quantitative gaps systematically
+- Map skills validation for each role
+- Assess timeline consistency
+## Output Format:
+```
+WORK EXPERIENCE COMPREHENSIVE ANALYSIS
+Total Positions: [Count]
+[For each position:]
+POSITION: [Job Title] at [Company] ([Dates])
+Duration: [Calculated length]
+Industry Context: [Determined field or "Cannot determine from CV"]
+Location: [Specified or "Not specified in CV"]
+Responsibility Breakdown:
+Responsibility 1: [Exact text from CV]
+- Action Verbs: [Leadership/action words used]
+- Scope Elements: [Scale/size mentions or "Not specified"]
+- Quantitative Data: [Numbers/percentages or "None stated"]
+- Technology References: [Tools/systems mentioned]
+- Outcome Descriptions: [Results stated or "Not specified"]
+- Skills Demonstrated: [Which CV skills this validates]
+- Missing Quantification: [Expected metrics absent]
+[Continue for ALL responsibilities under this position]
+Quantitative Gaps Summary:
+- Financial Data Missing: [Budget, revenue, cost information absent]
+- Performance Metrics Missing: [Achievement, target, efficiency data absent]
+- Scale Indicators Missing: [Team size, project scope, user base data absent]
+- Quality Measures Missing: [Accuracy, reliability, satisfaction data absent]
+- Timeline Data Missing: [Duration, deadline, delivery information absent]
+Skills Validation for This Position:
+- Demonstrated Skills: [CV skills proven by this position]
+- Undemonstrated Skills: [CV skills lacking evidence in this role]
+[Repeat for ALL positions]
+Timeline Consistency Analysis:
+- Employment Sequence: [Chronological verification]
+- Gap Analysis: [Any employment gaps with duration]
+- Date Consistency: [Verification across CV sections]
+```
+Complete this analysis for ALL positions before stopping.
+""",
+            'projects_analysis': """
+# Projects Comprehensive Examination
+Analyze ONLY the projects mentioned in the CV. You must analyze every project individually with complete technical and business breakdown.
+## Requirements:
+- Identify ALL projects mentioned anywhere in CV
+- Provide comprehensive technical implementation analysis
+- Assess business value and impact
+- Document quantitative outcomes present and missing
+- Validate skills demonstration through projects
+## Output Format:
+```
+PROJECTS COMPREHENSIVE ANALYSIS
+Total Projects: [Count]
+[For each project:]
+PROJECT: [Exact project name]
+CV Location: [Where mentioned in CV]
+Description: [Complete description from CV]
+Project Context:
+- Business Domain: [Industry/application area or "Not specified in CV"]
+- Timeline: [Duration/dates mentioned or "Not specified in CV"]
+- Team Role: [Position/responsibility or "Not specified in CV"]
+- Budget/Scale: [Resource scope or "Not specified in CV"]
+Technical Implementation Analysis:
+- Technologies Used: [Complete list from CV or "Not specified in CV"]
+- Architecture Approach: [Design methodology or "Not specified in CV"]
+- System Integration: [Connections described or "Not specified in CV"]
+- Performance Requirements: [Speed/scale needs or "Not specified in CV"]
+- Security Implementation: [Safety measures or "Not specified in CV"]
+- Development Methodology: [Process approach or "Not specified in CV"]
+Business Value Analysis:
+- Problem Solved: [Issue addressed or "Not specified in CV"]
+- User Benefits: [Value delivered or "Not specified in CV"]
+- Business Impact: [Organizational effect or "Not specified in CV"]
+- Innovation Elements: [Creative aspects or "Not specified in CV"]
+- Market Relevance: [Industry significance or "Not specified in CV"]
+Quantitative Outcomes Analysis:
+- User Metrics: [Adoption, usage data or "Not specified in CV"]
+- Performance Data: [Speed, efficiency improvements or "Not specified in CV"]
+- Business Results: [Cost, revenue impact or "Not specified in CV"]
+- Quality Measures: [Accuracy, reliability data or "Not specified in CV"]
+- Delivery Metrics: [Timeline, milestone data or "Not specified in CV"]
+- Scalability Results: [Growth capacity or "Not specified in CV"]
+Skills Validation Analysis:
+- Technical Skills Proven: [CV skills this project demonstrates]
+- Soft Skills Evidenced: [Leadership, communication shown]
+- Problem-Solving Demonstrated: [Analytical capabilities shown]
+- Innovation Displayed: [Creative thinking evidenced]
+- Undemonstrated Claims: [CV skills not supported by this project]
+Critical Missing Details:
+- Most Important Quantitative Gaps: [Priority measurements absent]
+- Technical Specification Gaps: [Missing technical details]
+- Business Impact Gaps: [Missing value metrics]
+[Repeat for ALL projects]
+```
+Complete this analysis for ALL projects before stopping.
+""",
+            'education_analysis': """
+# Education and Academic Background Analysis
+Analyze education, academic achievements, and learning background comprehensively.
+## Requirements:
+- Analyze each degree/certification individually
+- Assess academic achievements and research
+- Evaluate professional relevance
+- Identify missing academic details
+## Output Format:
+```
+EDUCATION AND ACADEMIC ANALYSIS
+[For each educational credential:]
+DEGREE: [Institution] - [Degree] - [Year]
+Recognition Level: [Institution standing assessment]
+Field Relevance: [Professional alignment with career]
+Academic Achievements: [Honors, GPA, thesis details or "Not specified in CV"]
+Research Work: [Thesis, projects, publications or "Not specified in CV"]
+Relevant Coursework: [Specific courses or "Not specified in CV"]
+Professional Value: [How education validates career claims]
+Missing Academic Details: [Standard information absent]
+[For each certification:]
+CERTIFICATION: [Title] - [Issuer] - [Date]
+Industry Recognition: [Credential value assessment]
+Professional Relevance: [Career alignment]
+Work Application Evidence: [How certification appears in experience]
+Missing Details: [Validity, renewal, credential ID gaps]
+Academic Development Assessment:
+- Educational Foundation Strength: [Assessment]
+- Professional Alignment: [How education supports career]
+- Continuing Education Evidence: [Ongoing learning demonstration]
+- Academic Gaps: [Missing standard educational information]
+```
+""",
+            'integration_analysis': """
+# Integration and Comprehensive Assessment
+Using previous analyses, provide final integration, cross-validation, and comprehensive recommendations.
+## Requirements:
+- Cross-validate findings across all sections
+- Identify overarching patterns and gaps
+- Provide prioritized improvement recommendations
+- Create final comprehensive assessment
+## Output Format:
+```
+INTEGRATION AND FINAL ASSESSMENT
+Cross-Validation Analysis:
+- Skills-Experience Alignment: [How well skills match work evidence]
+- Skills-Projects Alignment: [How well skills match project evidence]
+- Experience-Education Alignment: [Career progression logic]
+- Timeline Consistency: [Date and progression verification]
+Overarching Patterns:
+- Quantification Consistency: [Overall metrics presence assessment]
+- Professional Narrative: [Career story coherence]
+- Evidence Quality: [Overall validation strength]
+Priority Enhancement Recommendations:
+CRITICAL (Address Immediately):
+1. [Most important gap with specific recommendation]
+2. [Second most critical issue with solution]
+3. [Third priority with implementation suggestion]
+IMPORTANT (Address Next):
+1. [Significant improvement with specific action]
+2. [Next priority enhancement with details]
+3. [Additional important upgrade with guidance]
+BENEFICIAL (Address When Possible):
+1. [Professional enhancement opportunity]
+2. [Additional improvement suggestion]
+3. [Long-term development recommendation]
+Final Professional Assessment:
+- Overall Presentation Quality: [Comprehensive evaluation]
+- Career Advancement Readiness: [Assessment for target roles]
+- Competitive Positioning: [Market competitiveness evaluation]
+- Success Implementation Plan: [Next steps for improvement]
+```
+""",
+            'questions_prompt': questions_prompt
+        }
+    def create_client(self, api_key):
+        """Create the OpenAI client used for all completions"""
+        # Imported here so importing the analyzer stays cheap for processes that never call the API
+        from openai import OpenAI
+        return OpenAI(api_key=api_key, timeout=LLM_HARD_TIMEOUT_SECONDS)
+    def detect_cv_structure(self, cv_text, sections=None):
+        """Analyze CV to determine what sections are present (keywords or section headings)"""
+        structure = {key: pattern.search(cv_text) is not None for key, pattern in STRUCTURE_PATTERNS.items()}
+        # A section with its own heading always gets a pass to read it
+        for name, _, _ in segment_cv(cv_text) if sections is None else sections:
+            if name in HEADING_STRUCTURE:
+                structure[HEADING_STRUCTURE[name]] = True
+        return structure
+    def plan_analysis_passes(self, cv_structure):
+        """Determine which analysis passes are needed based on CV content"""
+        passes = []
+        if cv_structure['has_skills']:
+            passes.append('skills_analysis')
+        if cv_structure['has_experience']:
+            passes.append('experience_analysis')
+        if cv_structure['has_projects']:
+            passes.append('projects_analysis')
+        if cv_structure['has_education'] or cv_structure['has_certifications']:
+            passes.append('education_analysis')
+        # Always include integration pass
+        passes.append('integration_analysis')
+        return passes
+    def build_analysis_input(self, prompt, cv_text, analysis_type, previous_analyses=None, sections=None):
+        """Combine CV text, (for integration) earlier analyses and the pass prompt
+
+        The CV comes first so passes sending the whole CV share a prefix, which
+        the provider caches. With section spans, passes get only their excerpt.
+        """
+        if sections is not None:
+            cv_text = cv_excerpt(cv_text, sections, analysis_type)
+        context = f"CV CONTENT:\n{cv_text}"
+        if previous_analyses and analysis_type == 'integration_analysis':
+            context += f"\n\nPREVIOUS ANALYSES:\n{previous_analyses}"
+        return f"{context}\n\n{prompt}"
+    def build_questions_input(self, cv_text, analysis_text, verbosity="standard"):
+        """Combine CV text, analysis and the questions prompt, keeping the CV as the shared prefix"""
+        prompt = tier_prompt(self.prompt_templates['questions_prompt'], verbosity)
+        return f"CV CONTENT:\n{cv_text}\n\nCV REVIEW:\n{analysis_text}\n\n{prompt}"
+    def create_completion(self, combined_input, max_completion_tokens, site):
+        """Single-message completion through the LLM cache; site names the caller in cache stats"""
+        return cached_completion(self.client, self.gpt_model, [{"role": "user", "content": combined_input}], site,
+                                 self.llm_cache, max_completion_tokens=max_completion_tokens)
+    def analysis_request(self, prompt, cv_text, analysis_type, previous_analyses=None, sections=None,
+                         verbosity="standard"):
+        """(combined input, completion ceiling, call site) of one analysis pass"""
+        combined_input = self.build_analysis_input(tier_prompt(prompt, verbosity), cv_text, analysis_type,
+                                                   previous_analyses, sections)
+        return combined_input, tier_ceiling(ANALYSIS_COMPLETION_TOKENS, verbosity), tier_site(analysis_type, verbosity)
+    def call_openai_analysis(self, prompt, cv_text, analysis_type, previous_analyses=None, *, sections=None,
+                             verbosity="standard"):
+        """Make OpenAI API call for specific analysis type"""
+        return self.create_completion(*self.analysis_request(prompt, cv_text, analysis_type, previous_analyses,
+                                                             sections, verbosity))
+    def get_pass_dependencies(self, pass_type, analysis_passes):
+        """Return the planned passes that must finish before pass_type can start"""
+        return [dep for dep in self.pass_dependencies.get(pass_type, []) if dep in analysis_passes]
+    def format_previous_analyses(self, analyses, pass_types):
+        """Join earlier pass results in plan order for passes that build on them"""
+        return "".join(f"\n\n{pass_type.upper()}:\n{analyses[pass_type]}" for pass_type in pass_types)
+    def pass_result_path(self, session_uuid, pass_type, suffix="txt"):
+        """data/{session}_{pass}.txt holds a finished pass, .meta.json its checkpoint, .partial.txt output so far"""
+        return os.path.join("data", f"{session_uuid}_{pass_type}.{suffix}")
+    def checkpoint_meta(self, cv_text, pass_type, verbosity="standard"):
+        """What a pass result was computed from; a checkpoint is only reused when all of it matches
+
+        "sections" is the CV sections the pass read: "all", or its PASS_SECTIONS list when slicing is on.
+        """
+        return {"cv_hash": text_hash(cv_text),
+                "prompt_version": text_hash(tier_prompt(self.prompt_templates[pass_type], verbosity)),
+                "model": self.gpt_model,
+                "sections": PASS_SECTIONS.get(pass_type, "all") if self.section_slicing else "all"}
+    def save_pass_result(self, session_uuid, pass_type, result, meta=None):
+        """Save intermediate result of a single analysis pass, with its checkpoint metadata"""
+        meta_path = self.pass_result_path(session_uuid, pass_type, "meta.json")
+        result_path = self.pass_result_path(session_uuid, pass_type)
+        partial_path = self.pass_result_path(session_uuid, pass_type, "partial.txt")
+        # Temp files are per process and thread, so concurrent saves of the same pass never share one
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        # Drop the old checkpoint first so a crash mid-save never pairs it with the new result
+        try:
+            os.remove(meta_path)
+        except FileNotFoundError:
+            pass
+        with open(result_path + tmp_suffix, "w", encoding='utf-8') as f:
+            f.write(result)
+        os.replace(result_path + tmp_suffix, result_path)
+        if meta is not None:
+            with open(meta_path + tmp_suffix, "w", encoding='utf-8') as f:
+                json.dump(dict(meta, saved_at=time.time()), f)
+            os.replace(meta_path + tmp_suffix, meta_path)
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+    def load_checkpoints(self, cv_text, analysis_passes, session_uuid, verbosity="standard"):
+        """Results of planned passes already saved for this session from the same CV, prompt and model
+
+        A pass that builds on others is only reused when all of them were, since
+        its input contains their output.
+        """
+        analyses = {}
+        if not self.resume_checkpoints:
+            return analyses
+        for pass_type in analysis_passes:
+            if not all(dep in analyses for dep in self.get_pass_dependencies(pass_type, analysis_passes)):
+                continue
+            try:
+                with open(self.pass_result_path(session_uuid, pass_type, "meta.json"), "r", encoding='utf-8') as f:
+                    saved = json.load(f)
+                meta = self.checkpoint_meta(cv_text, pass_type, verbosity)
+                if any(saved.get(key) != value for key, value in meta.items()):
+                    continue
+                with open(self.pass_result_path(session_uuid, pass_type), "r", encoding='utf-8') as f:
+                    analyses[pass_type] = f.read()
+            except (FileNotFoundError, ValueError):
+                continue
+        return analyses
+    def execute_analysis_passes(self, cv_text, analysis_passes, session_uuid, on_pass_complete=None, *,
+                                sections=None, completed=None, verbosity="standard"):
+        """Run analysis passes concurrently, starting each pass as soon as its dependencies are done
+
+        Passes already in completed (pass type -> result, e.g. from checkpoints) are not run again.
+        """
+        analyses = dict(completed or {})
+        pending = [pass_type for pass_type in analysis_passes if pass_type not in analyses]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel_passes) as executor:
+            while pending or running:
+                # Submit every pass whose dependencies have completed
+                for pass_type in list(pending):
+                    dependencies = self.get_pass_dependencies(pass_type, analysis_passes)
+                    if all(dep in analyses for dep in dependencies):
+                        pending.remove(pass_type)
+                        future = executor.submit(
+                            self.call_openai_analysis,
+                            self.prompt_templates[pass_type],
+                            cv_text,
+                            pass_type,
+                            self.format_previous_analyses(analyses, dependencies),
+                            sections=sections,
+                            verbosity=verbosity
+                        )
+                        running[future] = pass_type
+                if not running:
+                    raise RuntimeError(f"Unresolvable pass dependencies: {', '.join(pending)}")
+                # Collect results on this thread so callers can safely update UI widgets
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pass_type = running.pop(future)
+                    result = future.result()
+                    analyses[pass_type] = result
+                    self.save_pass_result(session_uuid, pass_type, result,
+                                          self.checkpoint_meta(cv_text, pass_type, verbosity))
+                    if on_pass_complete:
+                        on_pass_complete(pass_type, len(analyses), len(analysis_passes))
+        # Keep report sections in plan order regardless of completion order
+        return {pass_type: analyses[pass_type] for pass_type in analysis_passes}
+    def compile_final_report(self, session_uuid, analyses, cv_structure):
+        """Compile all analyses into comprehensive final report"""
+        report_sections = []
+        # Header
+        report_sections.append(f"""
+COMPREHENSIVE CV ANALYSIS REPORT
+Session ID: {session_uuid}
+Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+GPT Model Used: {self.gpt_model}
+CV Structure Detected: {', '.join([k.replace('has_', '').title() for k, v in cv_structure.items() if v])}
+Analysis Passes Completed: {len(analyses)}
+================================================================================
+""")
+        # Add each analysis section
+        for analysis_type, content in analyses.items():
+            section_title = analysis_type.replace('_', ' ').title()
+            report_sections.append(f"""
+{section_title.upper()}
+================================================================================
+{content}
+""")
+        report_sections.append(
+            "================================================================================\nEND OF COMPREHENSIVE ANALYSIS\n================================================================================")
+        return '\n'.join(report_sections)
+    def describe_pass_plan(self, analysis_passes, resumed):
+        """Progress message for the start of the analysis"""
+        if resumed:
+            return (f"Executing {len(analysis_passes) - len(resumed)} analysis passes "
+                    f"({len(resumed)} resumed from checkpoints)...")
+        return f"Executing {len(analysis_passes)} analysis passes..."
+    def report_pass_progress(self, progress):
+        """on_pass_complete callback that forwards pass completion to a progress reporter"""
+        def on_pass_complete(pass_type, completed, total):
+            progress.update(completed / total, f"Completed {pass_type.replace('_', ' ').title()} ({completed}/{total})")
+        return on_pass_complete
+    def prepare_analysis(self, cv_file_path, session_uuid, progress, verbosity="standard"):
+        """Steps 1-3 of analyze_cv: read and segment the CV, plan its passes and load their checkpoints"""
+        # Read CV text
+        if not os.path.exists(cv_file_path):
+            raise FileNotFoundError(f"CV file not found: {cv_file_path}")
+        with open(cv_file_path, "r", encoding='utf-8') as f:
+            cv_text = f.read().strip()
+        # Step 1: Split the CV into sections and detect its structure
+        sections = segment_cv(cv_text)
+        cv_structure = self.detect_cv_structure(cv_text, sections)
+        # Step 2: Plan analysis passes
+        analysis_passes = self.plan_analysis_passes(cv_structure)
+        # Step 3: Reuse passes an earlier run of this session already completed
+        resumed = self.load_checkpoints(cv_text, analysis_passes, session_uuid, verbosity)
+        progress.update(len(resumed) / len(analysis_passes), self.describe_pass_plan(analysis_passes, resumed))
+        return {
+            "cv_text": cv_text,
+            "sections": sections,
+            "excerpt_sections": sections if self.section_slicing else None,
+            "cv_structure": cv_structure,
+            "analysis_passes": analysis_passes,
+            "resumed": resumed
+        }
+    def finish_analysis(self, session_uuid, plan, analyses, progress, verbosity="standard"):
+        """Step 5 of analyze_cv: compile, save and return the comprehensive report"""
+        final_report = self.compile_final_report(session_uuid, analyses, plan["cv_structure"])
+        # Save final report
+        final_file_path = os.path.join("data", f"{session_uuid}_comprehensive_analysis.txt")
+        with open(final_file_path, "w", encoding='utf-8') as f:
+            f.write(final_report)
+        progress.update(1.0, "Analysis complete!")
+        return {
+            "session_id": session_uuid,
+            "cv_structure_detected": plan["cv_structure"],
+            "cv_sections_detected": [{"name": name, "start": start, "end": end}
+                                     for name, start, end in plan["sections"]],
+            "analysis_passes_completed": plan["analysis_passes"],
+            "analysis_passes_resumed": list(plan["resumed"]),
+            "verbosity": verbosity,
+            "comprehensive_analysis": final_report,
+            "individual_analyses": analyses,
+            "final_file_path": final_file_path,
+            "success": True
+        }
+    def analyze_cv(self, cv_file_path, session_uuid, progress=None, *, verbosity="standard"):
+        """Main analysis function matching FastAPI version; verbosity is a VERBOSITY_TIERS key"""
+        progress = progress or ProgressReporter()
+        plan = self.prepare_analysis(cv_file_path, session_uuid, progress, verbosity)
+        # Step 4: Execute remaining analysis passes (independent passes run concurrently)
+        analyses = self.execute_analysis_passes(plan["cv_text"], plan["analysis_passes"], session_uuid,
+                                                self.report_pass_progress(progress),
+                                                sections=plan["excerpt_sections"], completed=plan["resumed"],
+                                                verbosity=verbosity)
+        return self.finish_analysis(session_uuid, plan, analyses, progress, verbosity)
+    def questions_request(self, cv_path, analysis_path, verbosity="standard"):
+        """(combined input, completion ceiling, call site) for generate_questions"""
+        # Read CV text
+        with open(cv_path, "r", encoding='utf-8') as f:
+            cv_text = f.read().strip()
+        # Read analysis text
+        with open(analysis_path, "r", encoding='utf-8') as f:
+            analysis_text = f.read()
+        return (self.build_questions_input(cv_text, analysis_text, verbosity),
+                tier_ceiling(MAX_COMPLETION_TOKENS, verbosity), tier_site("questions", verbosity))
+    def save_questions(self, session_id, ai_response, progress):
+        """Save generated questions to data/{session}_questions.txt and return the questions result"""
+        questions_file_path = os.path.join("data", f"{session_id}_questions.txt")
+        with open(questions_file_path, "w", encoding='utf-8') as f:
+            f.write(ai_response)
+        progress.update(1.0, "Questions generated successfully!")
+        return {
+            "response": ai_response,
+            "response_file": f"{session_id}_questions.txt",
+            "success": True
+        }
+    def generate_questions(self, cv_path, analysis_path, session_id, progress=None, *, verbosity="standard"):
+        """Generate questions matching FastAPI version signature"""
+        progress = progress or ProgressReporter()
+        try:
+            request = self.questions_request(cv_path, analysis_path, verbosity)
+            progress.update(0.3, "Generating interview questions...")
+            return self.save_questions(session_id, self.create_completion(*request), progress)
+        except Exception as e:
+            raise Exception(f"Error generating questions: {str(e)}") from e
+    def generate_enhanced_resume(self, cv_text, analysis_text, qa_data, generate_resume_prompt):
+        """Generate enhanced resume based on Q&A responses"""
+        combined_input = build_enhanced_resume_input(cv_text, analysis_text, qa_data, generate_resume_prompt)
+        return self.create_completion(combined_input, MAX_COMPLETION_TOKENS, "enhanced_resume")
+
+
+
+# Async CV Analyzer for the FastAPI backend
+class AsyncCVAnalyzer(CVAnalyzer):
+    """CVAnalyzer built on AsyncOpenAI so LLM calls never block the event loop"""
+    def __init__(self, gpt_model="o1-mini", api_key=os.getenv('OPENAI_API_KEY'),
+                 max_parallel_passes=int(os.getenv('ANALYSIS_MAX_PARALLEL_PASSES', '4')),
+                 max_concurrent_calls=int(os.getenv('OPENAI_MAX_CONCURRENT_CALLS', '100')), llm_cache=None,
+                 prompt_cache_warmup_seconds=PROMPT_CACHE_WARMUP_SECONDS):
+        super().__init__(gpt_model=gpt_model, api_key=api_key, max_parallel_passes=max_parallel_passes,
+                         llm_cache=llm_cache)
+        self.max_concurrent_calls = max(1, max_concurrent_calls)
+        self.prompt_cache_warmup_seconds = prompt_cache_warmup_seconds
+        self._call_semaphore = None
+    def create_client(self, api_key):
+        """Create the async OpenAI client used for all completions"""
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, timeout=LLM_HARD_TIMEOUT_SECONDS)
+    def _get_call_semaphore(self):
+        # Created lazily so it binds to the running event loop, not the import-time one
+        if self._call_semaphore is None:
+            self._call_semaphore = asyncio.Semaphore(self.max_concurrent_calls)
+        return self._call_semaphore
+    async def create_completion(self, combined_input, max_completion_tokens, site, *, on_delta=None):
+        """Single-message completion through the LLM cache, bounded by the shared in-flight call limit
+
+        With on_delta the completion is streamed and on_delta(text) gets every text delta as it arrives
+        (a cached answer arrives as one delta). When the returned text is not what was streamed (a hedge
+        won, or a truncated answer was requested again) on_delta(text, replace=True) gets the whole text.
+
+        max_completion_tokens is the ceiling: the request itself gets the budget from
+        completion_budget, and an answer cut off by that budget is requested again,
+        without streaming, with the ceiling.
+        """
+        messages = [{"role": "user", "content": combined_input}]
+        # Keyed on the ceiling, so answers stay cached whatever budget produced them
+        key = completion_key(self.gpt_model, messages, max_completion_tokens=max_completion_tokens)
+        loop = asyncio.get_running_loop()
+        # Cache lookups and writes touch the disk, so they run in the default executor
+        text = await loop.run_in_executor(None, self.llm_cache.get, key, site)
+        if text is not None:
+            if on_delta:
+                on_delta(text)
+            return text
+        budget = self.completion_budget(site, len(combined_input), max_completion_tokens)
+        streamed = []
+        def stream(delta):
+            streamed.append(delta)
+            on_delta(delta)
+        async with self._get_call_semaphore():
+            start_time = time.perf_counter()
+            text, usage, finish_reason, hedged = await self.hedged_completion(
+                messages, budget, site, on_delta=stream if on_delta else None
+            )
+            truncated = finish_reason == "length" and budget < max_completion_tokens
+            shared_llm_metrics().record(site, self.gpt_model, usage, time.perf_counter() - start_time,
+                                        len(combined_input), truncated, hedged=hedged)
+            if truncated:
+                start_time = time.perf_counter()
+                text, usage, _, hedged = await self.hedged_completion(messages, max_completion_tokens, site)
+                shared_llm_metrics().record(site, self.gpt_model, usage, time.perf_counter() - start_time,
+                                            len(combined_input), hedged=hedged, retry=True)
+        if on_delta and text != "".join(streamed).strip():
+            on_delta(text, replace=True)
+        await loop.run_in_executor(None, self.llm_cache.put, key, text, site, self.gpt_model)
+        return text
+    async def request_completion(self, messages, max_completion_tokens, *, on_delta=None):
+        """One chat completion request, streamed when on_delta is given; returns (text, usage, finish_reason)"""
+        if on_delta is None:
+            response = await self.client.chat.completions.create(
+                model=self.gpt_model,
+                messages=messages,
+                max_completion_tokens=max_completion_tokens
+            )
+            choice = response.choices[0]
+            return (choice.message.content or "").strip(), response.usage, choice.finish_reason
+        stream = await self.client.chat.completions.create(
+            model=self.gpt_model,
+            messages=messages,
+            max_completion_tokens=max_completion_tokens,
+            stream=True,
+            # Usage (with cached prompt tokens) arrives in a final chunk without choices
+            stream_options={"include_usage": True}
+        )
+        parts = []
+        usage = None
+        finish_reason = None
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    on_delta(parts[-1])
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+        finally:
+            # Release the connection when a losing or timed-out request is cancelled mid-stream
+            await stream.close()
+        return "".join(parts).strip(), usage, finish_reason
+    def completion_budget(self, site, input_chars, max_completion_tokens):
+        """Completion budget for a call: a high quantile of recent output tokens per input character, scaled to it
+
+        The budget gets COMPLETION_BUDGET_HEADROOM and stays between
+        COMPLETION_BUDGET_MIN_TOKENS and the ceiling; without enough history it is the ceiling.
+        """
+        if not ADAPTIVE_COMPLETION_BUDGETS:
+            return max_completion_tokens
+        ratio = shared_llm_metrics().output_ratio_quantile(site, self.gpt_model, COMPLETION_BUDGET_QUANTILE,
+                                                           COMPLETION_BUDGET_MIN_CALLS)
+        if ratio is None:
+            return max_completion_tokens
+        budget = int(ratio * input_chars * COMPLETION_BUDGET_HEADROOM)
+        return min(max_completion_tokens, max(COMPLETION_BUDGET_MIN_TOKENS, budget))
+    def call_deadlines(self, site):
+        """(soft, hard) deadline in seconds for a call from site; soft is None without enough latency history"""
+        if not LLM_HEDGING:
+            return None, LLM_HARD_TIMEOUT_SECONDS
+        soft_deadline = shared_llm_metrics().latency_quantile(site, self.gpt_model, LLM_HEDGE_QUANTILE,
+                                                              LLM_HEDGE_MIN_CALLS)
+        if soft_deadline is None:
+            return None, LLM_HARD_TIMEOUT_SECONDS
+        return soft_deadline, min(LLM_HARD_TIMEOUT_SECONDS, LLM_HARD_DEADLINE_FACTOR * soft_deadline)
+    async def hedged_completion(self, messages, max_completion_tokens, site, *, on_delta=None):
+        """Request a completion, sending a duplicate once it runs past the soft deadline; the first answer wins
+
+        Returns (text, usage, finish_reason, hedged), hedged telling whether the duplicate was sent.
+        Only the first request streams to on_delta (the returned text is the winner's).
+        The hedge needs a free call slot, so it never pushes the in-flight calls past
+        max_concurrent_calls. The losing request is cancelled, and TimeoutError is
+        raised when neither has answered by the hard deadline.
+        """
+        loop = asyncio.get_running_loop()
+        metrics = shared_llm_metrics()
+        semaphore = self._get_call_semaphore()
+        soft_deadline, hard_deadline = self.call_deadlines(site)
+        start_time = loop.time()
+        primary = asyncio.ensure_future(self.request_completion(messages, max_completion_tokens, on_delta=on_delta))
+        hedge = None
+        pending = {primary}
+        errors = []
+        try:
+            while pending:
+                # Step 1: Wait for an answer until the hedge is due or the hard deadline passes
+                wake_at = start_time + hard_deadline
+                if hedge is None and soft_deadline is not None:
+                    wake_at = min(wake_at, start_time + soft_deadline)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wake_at - loop.time()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is hedge:
+                            metrics.record_event(site, "hedge_wins")
+                        return (*attempt.result(), hedge is not None)
+                    errors.append(attempt.exception())
+                if done or not pending:
+                    continue
+                if loop.time() >= start_time + hard_deadline:
+                    metrics.record_event(site, "timeouts")
+                    raise TimeoutError(f"{site} call did not finish within {hard_deadline:.1f}s")
+                # Step 2: Past the soft deadline: send the hedge if a call slot is free
+                if hedge is None and soft_deadline is not None:
+                    if semaphore.locked():
+                        soft_deadline = None
+                        continue
+                    await semaphore.acquire()
+                    hedge = asyncio.ensure_future(self.request_completion(messages, max_completion_tokens))
+                    hedge.add_done_callback(lambda _: semaphore.release())
+                    pending.add(hedge)
+                    metrics.record_event(site, "hedged")
+            raise errors[0]
+        finally:
+            for attempt in (primary, hedge):
+                # A loser that already failed has its exception marked as seen
+                if attempt is not None and not attempt.cancel() and not attempt.cancelled():
+                    attempt.exception()
+    async def call_openai_analysis(self, prompt, cv_text, analysis_type, previous_analyses=None, *, sections=None,
+                                   verbosity="standard", on_delta=None):
+        """Make OpenAI API call for specific analysis type; on_delta(text) streams the answer"""
+        return await self.create_completion(*self.analysis_request(prompt, cv_text, analysis_type, previous_analyses,
+                                                                   sections, verbosity), on_delta=on_delta)
+    async def execute_analysis_passes(self, cv_text, analysis_passes, session_uuid, on_pass_complete=None, *,
+                                      sections=None, completed=None, verbosity="standard", on_delta=None):
+        """Run analysis passes as tasks, each awaiting only the passes it depends on
+
+        Passes already in completed (pass type -> result) are not run again; their
+        result is sent to on_delta as one delta. Every pass is streamed and its
+        output so far is kept in data/{session}_{pass}.partial.txt until it
+        finishes, so an interrupted run leaves what was generated. Replacements
+        (see create_completion) reach on_delta as on_delta(pass_type, text, replace=True).
+
+        Without section excerpts the passes share the CV as a prefix, which the
+        provider only caches once a request has been processed. With
+        prompt_cache_warmup_seconds set (and a non-reasoning model) the first
+        pass to run waits for nothing, and the others wait for its first token
+        (at most prompt_cache_warmup_seconds) before they start.
+        """
+        warmup_seconds = 0 if self.gpt_model.startswith(REASONING_MODEL_PREFIXES) else self.prompt_cache_warmup_seconds
+        analyses = dict(completed or {})
+        tasks = {}
+        remaining = [pass_type for pass_type in analysis_passes if pass_type not in analyses]
+        prefix_cached = asyncio.Event()
+        if on_delta:
+            for pass_type in analyses:
+                on_delta(pass_type, analyses[pass_type])
+        def on_pass_delta(pass_type, partial_file, text, replace=False):
+            if replace:
+                partial_file.seek(0)
+                partial_file.truncate()
+            partial_file.write(text)
+            partial_file.flush()
+            if pass_type == remaining[0]:
+                prefix_cached.set()
+            if on_delta:
+                if replace:
+                    on_delta(pass_type, text, replace=True)
+                else:
+                    on_delta(pass_type, text)
+        async def run_pass(pass_type):
+            dependencies = self.get_pass_dependencies(pass_type, analysis_passes)
+            await asyncio.gather(*(tasks[dep] for dep in dependencies if dep in tasks))
+            if warmup_seconds > 0 and sections is None and pass_type != remaining[0] and not prefix_cached.is_set():
+                try:
+                    await asyncio.wait_for(prefix_cached.wait(), warmup_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            with open(self.pass_result_path(session_uuid, pass_type, "partial.txt"), "w",
+                      encoding='utf-8') as partial_file:
+                result = await self.call_openai_analysis(
+                    self.prompt_templates[pass_type],
+                    cv_text,
+                    pass_type,
+                    self.format_previous_analyses(analyses, dependencies),
+                    sections=sections,
+                    verbosity=verbosity,
+                    on_delta=partial(on_pass_delta, pass_type, partial_file)
+                )
+            analyses[pass_type] = result
+            self.save_pass_result(session_uuid, pass_type, result, self.checkpoint_meta(cv_text, pass_type, verbosity))
+            if on_pass_complete:
+                on_pass_complete(pass_type, len(analyses), len(analysis_passes))
+            return result
+        for pass_type in remaining:
+            tasks[pass_type] = asyncio.ensure_future(run_pass(pass_type))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            # Do not leave sibling passes running after a failure
+            for task in tasks.values():
+                task.cancel()
+        # Keep report sections in plan order regardless of completion order
+        return {pass_type: analyses[pass_type] for pass_type in analysis_passes}
+    async def analyze_cv(self, cv_file_path, session_uuid, progress=None, *, verbosity="standard", on_delta=None):
+        """Main analysis function matching FastAPI version; on_delta(pass_type, text) streams pass output"""
+        progress = progress or ProgressReporter()
+        plan = self.prepare_analysis(cv_file_path, session_uuid, progress, verbosity)
+        # Step 4: Execute remaining analysis passes (independent passes run concurrently)
+        analyses = await self.execute_analysis_passes(plan["cv_text"], plan["analysis_passes"], session_uuid,
+                                                      self.report_pass_progress(progress),
+                                                      sections=plan["excerpt_sections"], completed=plan["resumed"],
+                                                      verbosity=verbosity, on_delta=on_delta)
+        return self.finish_analysis(session_uuid, plan, analyses, progress, verbosity)
+    async def generate_questions(self, cv_path, analysis_path, session_id, progress=None, *, verbosity="standard",
+                                 on_delta=None):
+        """Generate questions matching FastAPI version signature; on_delta("questions", text) streams them"""
+        progress = progress or ProgressReporter()
+        try:
+            request = self.questions_request(cv_path, analysis_path, verbosity)
+            progress.update(0.3, "Generating interview questions...")
+            ai_response = await self.create_completion(
+                *request, on_delta=partial(on_delta, "questions") if on_delta else None
+            )
+            return self.save_questions(session_id, ai_response, progress)
+        except Exception as e:
+            raise Exception(f"Error generating questions: {str(e)}") from e
+    async def generate_enhanced_resume(self, cv_text, analysis_text, qa_data, generate_resume_prompt, *,
+                                       on_delta=None):
+        """Generate enhanced resume based on Q&A responses; on_delta("enhanced_resume", text) streams it"""
+        combined_input = build_enhanced_resume_input(cv_text, analysis_text, qa_data, generate_resume_prompt)
+        return await self.create_completion(combined_input, MAX_COMPLETION_TOKENS, "enhanced_resume",
+                                            on_delta=partial(on_delta, "enhanced_resume") if on_delta else None)
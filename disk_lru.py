@@ -0,0 +1,47 @@
+import os
+
+
+def touch(path):
+    """Mark a cache file as recently used; returns False if it was removed in the meantime"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def cache_entries(cache_dir, suffix, companion_suffixes=()):
+    """(last_used, size, key) for every file in cache_dir ending in suffix
+
+    An entry's size includes its companion files (same key, other suffixes);
+    entries missing a companion are incomplete and skipped. last_used is the
+    modification time of the main file, which readers bump with touch().
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        key = name[:-len(suffix)]
+        try:
+            stat = os.stat(os.path.join(cache_dir, name))
+            size = stat.st_size + sum(os.path.getsize(os.path.join(cache_dir, key + companion))
+                                      for companion in companion_suffixes)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, size, key))
+    return entries
+
+
+def evict_entries(entries, max_bytes, remove, oldest_allowed=None):
+    """Remove entries unused since oldest_allowed, then least recently used ones until max_bytes fit
+
+    remove(key) deletes one entry's files. Returns the bytes left.
+    """
+    entries = sorted(entries)
+    total_bytes = sum(size for _, size, _ in entries)
+    for last_used, size, key in entries:
+        if total_bytes <= max_bytes and (oldest_allowed is None or last_used >= oldest_allowed):
+            break
+        remove(key)
+        total_bytes -= size
+    return total_bytes
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from disk_lru import cache_entries, evict_entries, touch
+from pdf_reader import EXTRACTOR_VERSION
+
+# Extraction cache configuration
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join("cache", "extraction"))
+EXTRACTION_CACHE_MAX_MB = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "500"))
+
+
+def hash_pdf_bytes(content):
+    """SHA-256 hex digest of the uploaded PDF bytes"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed on-disk cache of cleaned CV text, keyed by PDF hash and extractor version
+
+    Entries are evicted least-recently-used first once the cache grows past max_bytes.
+    Hit/miss counters are kept per process.
+    """
+
+    def __init__(self, cache_dir=EXTRACTION_CACHE_DIR, max_bytes=int(EXTRACTION_CACHE_MAX_MB * 1024 * 1024)):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, pdf_digest):
+        """Cache key for a PDF digest under the current extractor version"""
+        return f"{pdf_digest}-v{EXTRACTOR_VERSION}"
+
+    def _text_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_file(self, pdf_digest, output_path):
+        """Copy cached cleaned text for a PDF digest to output_path; returns its metadata, or None on a miss"""
+        key = self.make_key(pdf_digest)
+        try:
+            with open(self._meta_path(key), "r", encoding='utf-8') as f:
+                meta = json.load(f)
+            shutil.copyfile(self._text_path(key), output_path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # Touch the entry so eviction sees it as recently used; a concurrent eviction may have removed it
+        touch(self._text_path(key))
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += meta.get("extraction_seconds", 0.0)
+        return meta
+
+    def put_file(self, pdf_digest, text_path, characters, extraction_seconds, truncated=None, tokens_saved=None):
+        """Store the cleaned text file for a PDF digest, then evict down to max_bytes"""
+        key = self.make_key(pdf_digest)
+        meta = {
+            "pdf_sha256": pdf_digest,
+            "extractor_version": EXTRACTOR_VERSION,
+            "characters": characters,
+            "extraction_seconds": extraction_seconds,
+            "truncated": truncated,
+            "tokens_saved": tokens_saved or {},
+            "created_at": time.time()
+        }
+        # Copy to temp files and rename so readers never see partial entries
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(self._meta_path(key) + tmp_suffix, "w", encoding='utf-8') as f:
+            json.dump(meta, f)
+        shutil.copyfile(text_path, self._text_path(key) + tmp_suffix)
+        os.replace(self._meta_path(key) + tmp_suffix, self._meta_path(key))
+        os.replace(self._text_path(key) + tmp_suffix, self._text_path(key))
+        self.evict()
+
+    def _entries(self):
+        """(last_used, size, key) for every complete cache entry"""
+        return cache_entries(self.cache_dir, ".txt", [".json"])
+
+    def _remove(self, key):
+        for path in (self._text_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        evict_entries(self._entries(), self.max_bytes, self._remove)
+
+    def stats(self):
+        """Hit/miss counters and current cache size"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "extraction_seconds_saved": round(self.seconds_saved, 3),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "extractor_version": EXTRACTOR_VERSION
+        }
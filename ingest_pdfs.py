@@ -0,0 +1,139 @@
+"""Bulk PDF ingestion: extract a backlog of resumes into resume/cv{id}_extracted.txt files.
+
+Every processed PDF is appended to a JSONL manifest (input path, hash, session
+id, status, time taken). Re-running with the same manifest skips files that
+already finished, so an interrupted run picks up where it stopped.
+
+Usage:
+    python ingest_pdfs.py incoming/ --processes 8
+    python ingest_pdfs.py "incoming/2024-*/*.pdf" --manifest data/ingest_manifest.jsonl
+    python ingest_pdfs.py incoming/ --retry-failed
+"""
+import argparse
+import glob
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extraction_cache import EXTRACTION_CACHE_DIR, ExtractionCache, hash_pdf_bytes
+from pdf_reader import prompt_tokens_saved
+from pdf_sandbox import extract_sandboxed
+
+# Statuses that are never redone; "failed" is retried with --retry-failed
+FINISHED_STATUSES = {"done", "truncated", "no_text_layer"}
+
+
+def find_pdfs(inputs):
+    """Sorted, de-duplicated PDF paths from directories (searched recursively) and glob patterns"""
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*.pdf")
+        paths.update(path for path in glob.glob(pattern, recursive=True) if path.lower().endswith(".pdf"))
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def load_manifest(manifest_path):
+    """Latest manifest record per input path"""
+    records = {}
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, "r", encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave the last line half-written
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def ingest_pdf(pdf_path, output_dir, cache_dir):
+    """Extract one PDF into output_dir in a sandbox and return its manifest record"""
+    start_time = time.perf_counter()
+    session_id = str(uuid.uuid4())[:8]
+    output_path = os.path.join(output_dir, f"cv{session_id}_extracted.txt")
+    record = {"path": pdf_path, "sha256": None, "session_id": session_id, "extracted_cv_path": output_path,
+              "status": "failed", "pages": None, "characters": 0, "cache_hit": False, "error": None}
+    try:
+        with open(pdf_path, "rb") as f:
+            content = f.read()
+        record["sha256"] = hash_pdf_bytes(content)
+        extraction_cache = ExtractionCache(cache_dir)
+        cached = extraction_cache.get_file(record["sha256"], output_path)
+        if cached:
+            record.update(status="truncated" if cached.get("truncated") else "done",
+                          characters=cached["characters"], cache_hit=True)
+        else:
+            extraction = extract_sandboxed(content, output_path)
+            record["pages"] = extraction["pages"]
+            record["characters"] = extraction["characters"]
+            if extraction["no_text_layer"]:
+                record["status"] = "no_text_layer"
+            elif extraction["characters"]:
+                record["status"] = "truncated" if extraction["truncated"] else "done"
+                record["truncated_reason"] = extraction["truncated"]
+                record["tokens_saved"] = prompt_tokens_saved(extraction["stats"])
+                if extraction["truncated"] in (None, "page_limit"):
+                    extraction_cache.put_file(record["sha256"], output_path, extraction["characters"],
+                                              extraction["seconds"], extraction["truncated"], record["tokens_saved"])
+            else:
+                record["error"] = f"No text extracted ({extraction['truncated'] or 'all backends failed'})"
+    except Exception as e:
+        record["error"] = str(e)
+    if record["status"] in ("failed", "no_text_layer") and os.path.exists(output_path):
+        os.remove(output_path)
+    record["seconds"] = round(time.perf_counter() - start_time, 3)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract a backlog of PDF resumes")
+    parser.add_argument("inputs", nargs="+", help="Directories (searched recursively) or glob patterns")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--output-dir", default="resume")
+    parser.add_argument("--manifest", default=os.path.join("data", "ingest_manifest.jsonl"))
+    parser.add_argument("--cache-dir", default=EXTRACTION_CACHE_DIR)
+    parser.add_argument("--retry-failed", action="store_true", help="Also redo files recorded as failed")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(args.manifest) or ".", exist_ok=True)
+
+    # Step 1: Work out what still needs doing
+    pdf_paths = find_pdfs(args.inputs)
+    finished = FINISHED_STATUSES if args.retry_failed else FINISHED_STATUSES | {"failed"}
+    previous = load_manifest(args.manifest)
+    pending = [path for path in pdf_paths if previous.get(path, {}).get("status") not in finished]
+    print(f"{len(pdf_paths)} PDFs found, {len(pdf_paths) - len(pending)} already finished, {len(pending)} to process")
+    if not pending:
+        return
+
+    # Step 2: Extract across processes, appending each record as soon as it is known
+    start_time = time.perf_counter()
+    counts = {}
+    pages = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.processes)) as executor, \
+            open(args.manifest, "a", encoding='utf-8') as manifest:
+        futures = [executor.submit(ingest_pdf, path, args.output_dir, args.cache_dir) for path in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            pages += record["pages"] or 0
+            print(f"[{done}/{len(pending)}] {record['status']:>13} {record['seconds']:>7.2f}s {record['path']}")
+
+    # Step 3: Throughput report
+    seconds = time.perf_counter() - start_time
+    summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+    print(f"Processed {len(pending)} PDFs in {seconds:.1f}s ({summary})")
+    print(f"Throughput: {pages / seconds:.1f} pages/s, {len(pending) / seconds:.2f} PDFs/s "
+          f"(cache hits are not counted as pages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Durable queue for long-running LLM work (analysis, questions, enhanced resumes).
+
+Jobs are rows in a local SQLite database, so they survive restarts and can be
+shared by several API worker processes. A job goes queued -> running -> done or
+failed. A running job holds a lease that its worker keeps renewing; when the
+lease runs out (the process died) the job is queued again, up to
+JOB_MAX_ATTEMPTS times. Jobs failing with a transient error (a timeout, rate
+limit or provider outage) are queued again too, after a growing delay.
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from progress import ProgressReporter
+
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join("data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose lease has not been renewed for this long is requeued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = JOB_LEASE_SECONDS / 4
+# Delay before the first retry of a transiently failed job; it doubles with every further attempt
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+# How often idle workers look for jobs queued by other processes
+JOB_POLL_SECONDS = 1.0
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    session_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    available_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def job_view(row):
+    """Public fields and timings of a job row (no payload or result)"""
+    now = time.time()
+    job = {name: row[name] for name in ("id", "kind", "session_id", "status", "attempts", "progress", "message",
+                                        "error", "created_at", "started_at", "finished_at")}
+    job["queued_seconds"] = round((row["started_at"] or now) - row["created_at"], 3)
+    job["run_seconds"] = round((row["finished_at"] or now) - row["started_at"], 3) if row["started_at"] else None
+    return job
+
+
+class JobQueue:
+    """SQLite-backed job table; every call uses its own short-lived connection"""
+
+    def __init__(self, db_path=JOB_QUEUE_DB, max_attempts=JOB_MAX_ATTEMPTS, lease_seconds=JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self.connect()
+        try:
+            # WAL lets status polls read while a worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Databases created before retries had no available_at column
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "available_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN available_at REAL")
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Connection holding the database write lock until the block ends"""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def execute(self, sql, params=()):
+        """Run one statement in autocommit mode and return its rows"""
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def enqueue(self, kind, payload, session_id=None):
+        """Queue a job and return its id"""
+        job_id = str(uuid.uuid4())
+        self.execute(
+            "INSERT INTO jobs (id, kind, session_id, payload, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, session_id, json.dumps(payload), time.time())
+        )
+        return job_id
+
+    def claim(self, worker):
+        """Mark the oldest queued job as running for worker and return it, or None"""
+        now = time.time()
+        with self.transaction() as conn:
+            # Step 1: Requeue (or give up on) jobs whose worker stopped renewing the lease
+            expired = now - self.lease_seconds
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, "
+                "error = 'Worker stopped responding on every attempt' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, expired, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (expired,)
+            )
+
+            # Step 2: Take the oldest queued job that is not waiting out a retry delay
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND (available_at IS NULL OR available_at <= ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?, "
+                "heartbeat_at = ?, progress = 0, message = NULL WHERE id = ?",
+                (worker, now, now, row["id"])
+            )
+        return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"])}
+
+    def heartbeat(self, job_ids):
+        """Renew the lease of running jobs"""
+        if job_ids:
+            placeholders = ", ".join("?" for _ in job_ids)
+            self.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND id IN ({placeholders})",
+                         [time.time(), *job_ids])
+
+    def report_progress(self, updates):
+        """Store the latest progress of running jobs: {job_id: (fraction, message)}, in one transaction"""
+        if updates:
+            with self.transaction() as conn:
+                conn.executemany("UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = 'running'",
+                                 [(fraction, message, job_id) for job_id, (fraction, message) in updates.items()])
+
+    def finish(self, job_id, result):
+        self.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, progress = 1, finished_at = ? WHERE id = ?",
+            (json.dumps(result), time.time(), job_id)
+        )
+
+    def fail(self, job_id, error):
+        self.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                     (error, time.time(), job_id))
+
+    def retry(self, job_id, error, backoff_seconds=JOB_RETRY_BACKOFF_SECONDS):
+        """Queue a job that failed transiently again after a delay, or fail it on its last attempt
+
+        The delay is backoff_seconds, doubled for every attempt after the first.
+        Returns True when the job was queued again.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND status = 'running'", (job_id,)).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] >= self.max_attempts:
+                conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                             (error, now, job_id))
+                return False
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, error = ?, available_at = ? WHERE id = ?",
+                (error, now + backoff_seconds * 2 ** (row["attempts"] - 1), job_id)
+            )
+        return True
+
+    def release(self, job_id):
+        """Hand a running job back to the queue without counting the attempt (graceful shutdown)"""
+        self.execute(
+            "UPDATE jobs SET status = 'queued', attempts = attempts - 1, worker = NULL "
+            "WHERE id = ? AND status = 'running'",
+            (job_id,)
+        )
+
+    def get(self, job_id):
+        """Job status and timings, or None for an unknown id"""
+        rows = self.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return job_view(rows[0]) if rows else None
+
+    def result(self, job_id):
+        """Result of a finished job, or None"""
+        rows = self.execute("SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,))
+        return json.loads(rows[0]["result"]) if rows else None
+
+    def list(self, status=None, limit=50):
+        """Most recent jobs first, optionally only those with status"""
+        if status:
+            rows = self.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                                (status, limit))
+        else:
+            rows = self.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [job_view(row) for row in rows]
+
+    def counts(self):
+        """Number of jobs per status"""
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in self.execute("SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["jobs"]
+        return counts
+
+
+class JobProgressReporter(ProgressReporter):
+    """Hands progress to the worker pool, which stores it on the job row so status polls can show it"""
+
+    def __init__(self, pool, job_id):
+        self.pool = pool
+        self.job_id = job_id
+
+    def update(self, fraction, message):
+        self.pool.post_progress(self.job_id, fraction, message)
+
+
+class JobOutput:
+    """LLM output of a job running in this process: every delta so far, forwarded to listeners as it arrives"""
+
+    def __init__(self):
+        self.events = []
+        self.listeners = set()
+        self.finished = False
+
+    def publish(self, pass_type, text, replace=False):
+        """on_delta callback for the job handler: record a ("delta" or "replace", {"pass", "text"}) event"""
+        event = ("replace" if replace else "delta", {"pass": pass_type, "text": text})
+        self.events.append(event)
+        for listener in self.listeners:
+            listener.put_nowait(event)
+
+    def finish(self):
+        """The job stopped running here; listeners get None"""
+        self.finished = True
+        for listener in self.listeners:
+            listener.put_nowait(None)
+
+    def subscribe(self):
+        """(events so far, asyncio.Queue receiving the later ones and then None)"""
+        listener = asyncio.Queue()
+        if self.finished:
+            listener.put_nowait(None)
+        self.listeners.add(listener)
+        return list(self.events), listener
+
+    def unsubscribe(self, listener):
+        self.listeners.discard(listener)
+
+
+class JobWorkerPool:
+    """Async workers that run queued jobs with the handler registered for their kind
+
+    Handlers are coroutine functions taking (payload, progress, on_delta) and
+    returning a JSON-serializable result. An exception marks the job as failed,
+    unless is_transient(exception) is true: then the job is retried. The output
+    a handler streams to on_delta is kept in outputs[job_id] while it runs.
+
+    Database writes run in the default executor, never on the event loop.
+    Progress updates only record the latest update per job; a single writer
+    task stores them, so a burst of updates costs one write.
+    """
+
+    def __init__(self, queue, handlers, workers=JOB_WORKERS, is_transient=None):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.is_transient = is_transient or (lambda error: False)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = set()
+        self.outputs = {}
+        self.tasks = []
+        # Latest unsaved progress per job, filled from any thread
+        self._progress = {}
+        self._progress_lock = threading.Lock()
+        # Created in start() so they belong to the server's event loop
+        self.wakeup = None
+        self.progress_ready = None
+        self._loop = None
+
+    def start(self):
+        """Start the workers, the progress writer and the lease heartbeat on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.progress_ready = asyncio.Event()
+        self.tasks = [asyncio.ensure_future(self.work()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.ensure_future(self.heartbeat()))
+        self.tasks.append(asyncio.ensure_future(self.write_progress()))
+
+    async def stop(self):
+        """Cancel the workers; their running jobs go back to the queue"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def post_progress(self, job_id, fraction, message):
+        """Record a job's latest progress for the writer; safe to call from any thread"""
+        with self._progress_lock:
+            self._progress[job_id] = (fraction, message)
+        self._loop.call_soon_threadsafe(self.progress_ready.set)
+
+    def discard_progress(self, job_id):
+        """Drop unsaved progress of a job that is about to finish or leave this worker"""
+        with self._progress_lock:
+            self._progress.pop(job_id, None)
+
+    async def write_progress(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.progress_ready.wait()
+            self.progress_ready.clear()
+            with self._progress_lock:
+                updates, self._progress = self._progress, {}
+            await loop.run_in_executor(None, self.queue.report_progress, updates)
+
+    def notify(self):
+        """Wake an idle worker after a job was queued from this process"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    async def work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.wakeup.clear()
+            # Claiming may wait on the database lock, so keep it off the event loop
+            job = await loop.run_in_executor(None, self.queue.claim, self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run(job)
+
+    async def run(self, job):
+        loop = asyncio.get_running_loop()
+        self.running.add(job["id"])
+        output = self.outputs[job["id"]] = JobOutput()
+        try:
+            handler = self.handlers[job["kind"]]
+            result = await handler(job["payload"], JobProgressReporter(self, job["id"]), output.publish)
+            self.discard_progress(job["id"])
+            await loop.run_in_executor(None, self.queue.finish, job["id"], result)
+        except asyncio.CancelledError:
+            self.discard_progress(job["id"])
+            await loop.run_in_executor(None, self.queue.release, job["id"])
+            raise
+        except Exception as e:
+            self.discard_progress(job["id"])
+            if self.is_transient(e):
+                await loop.run_in_executor(None, self.queue.retry, job["id"], str(e))
+            else:
+                await loop.run_in_executor(None, self.queue.fail, job["id"], str(e))
+        finally:
+            # After the job row is updated, so a listener told the job stopped sees its final status
+            self.running.discard(job["id"])
+            del self.outputs[job["id"]]
+            output.finish()
+
+    async def heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            await loop.run_in_executor(None, self.queue.heartbeat, list(self.running))
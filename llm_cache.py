@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from disk_lru import cache_entries, evict_entries, touch
+from llm_metrics import shared_llm_metrics
+
+# LLM response cache configuration
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("cache", "llm"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+# Skip lookups (fresh responses are still stored), e.g. after a prompt change outside the code
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "false").lower() == "true"
+# The disk store is rescanned for eviction when its estimated size passes max_bytes, or after this long
+EVICT_SCAN_SECONDS = 3600
+
+
+def completion_key(model, messages, **params):
+    """SHA-256 hex digest of the model, the full message list and the generation parameters"""
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """Content-addressed cache of completion texts: an in-process LRU in front of an on-disk store
+
+    Disk entries older than max_age_seconds are treated as misses and removed;
+    the store is evicted least-recently-used first once it grows past
+    max_bytes. Hits and misses are counted per call site.
+
+    Lookups may read and writes always write the disk: async callers run them
+    in an executor. The store size is tracked from the last eviction scan plus
+    the entries written since, so a write only rescans the directory when that
+    estimate passes max_bytes or the last scan is EVICT_SCAN_SECONDS old.
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024),
+                 max_age_seconds=LLM_CACHE_MAX_AGE_DAYS * 86400, memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                 bypass=LLM_CACHE_BYPASS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.memory_entries = memory_entries
+        self.bypass = bypass
+        self.memory = OrderedDict()
+        self.sites = {}
+        self._lock = threading.Lock()
+        # Estimated store size (None until the first scan) and when it was last scanned
+        self._bytes = None
+        self._scanned_at = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _count(self, site, outcome):
+        with self._lock:
+            counters = self.sites.setdefault(site, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0})
+            counters[outcome] += 1
+
+    def _remember(self, key, text):
+        with self._lock:
+            self.memory[key] = text
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, key, site="default"):
+        """Cached completion text for key, or None"""
+        if self.bypass:
+            self._count(site, "bypassed")
+            return None
+        with self._lock:
+            text = self.memory.get(key)
+            if text is not None:
+                self.memory.move_to_end(key)
+        if text is not None:
+            self._count(site, "memory_hits")
+            return text
+        try:
+            with open(self._path(key), "r", encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._count(site, "misses")
+            return None
+        if time.time() - entry["created_at"] > self.max_age_seconds:
+            self._remove(key)
+            self._count(site, "misses")
+            return None
+        # Touch the entry so eviction sees it as recently used; if it was evicted meanwhile the text is still good
+        touch(self._path(key))
+        self._remember(key, entry["text"])
+        self._count(site, "disk_hits")
+        return entry["text"]
+
+    def put(self, key, text, site="default", model=None):
+        """Store a completion text in both tiers, then evict the disk store down to max_bytes if needed"""
+        if not text:
+            return
+        self._remember(key, text)
+        entry = {"text": text, "site": site, "model": model, "created_at": time.time()}
+        # Write to a temp file and rename so readers never see partial entries
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            if self._bytes is not None:
+                # Overwriting an entry counts it twice, which at worst rescans early
+                self._bytes += os.path.getsize(self._path(key))
+            scan_due = (self._bytes is None or self._bytes > self.max_bytes
+                        or time.time() - self._scanned_at > EVICT_SCAN_SECONDS)
+        if scan_due:
+            self.evict()
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """(last_used, size, key) for every disk entry"""
+        return cache_entries(self.cache_dir, ".json")
+
+    def evict(self):
+        """Remove entries unused for max_age_seconds, then least recently used ones until the store fits"""
+        now = time.time()
+        remaining = evict_entries(self._entries(), self.max_bytes, self._remove, now - self.max_age_seconds)
+        with self._lock:
+            self._bytes = remaining
+            self._scanned_at = now
+
+    def stats(self):
+        """Per-call-site hit ratios and current store size"""
+        with self._lock:
+            sites = {site: dict(counters) for site, counters in self.sites.items()}
+        for counters in sites.values():
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            lookups = hits + counters["misses"] + counters["bypassed"]
+            counters["hit_ratio"] = hits / lookups if lookups else 0.0
+        entries = self._entries()
+        return {
+            "sites": sites,
+            "memory_entries": len(self.memory),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "bypass": self.bypass
+        }
+
+
+_shared_cache = None
+
+
+def shared_llm_cache():
+    """Process-wide LLMCache, so every call site reports into the same counters"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMCache()
+    return _shared_cache
+
+
+def cached_completion(client, model, messages, site, cache=None, **params):
+    """Text of a chat completion, served from the cache when the same request was made before"""
+    cache = cache or shared_llm_cache()
+    key = completion_key(model, messages, **params)
+    text = cache.get(key, site)
+    if text is None:
+        start_time = time.perf_counter()
+        response = client.chat.completions.create(model=model, messages=messages, **params)
+        shared_llm_metrics().record(site, model, response.usage, time.perf_counter() - start_time,
+                                    sum(len(message["content"]) for message in messages))
+        text = response.choices[0].message.content.strip()
+        cache.put(key, text, site, model)
+    return text
@@ -0,0 +1,216 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# LLM call metrics configuration
+LLM_METRICS_LOG = os.getenv("LLM_METRICS_LOG", os.path.join("data", "llm_calls.jsonl"))
+# Recent calls kept per call site
+LLM_METRICS_HISTORY = int(os.getenv("LLM_METRICS_HISTORY", "500"))
+# Latency and output size quantiles are recomputed from the history at most this often
+LLM_METRICS_QUANTILE_TTL_SECONDS = float(os.getenv("LLM_METRICS_QUANTILE_TTL_SECONDS", "30"))
+# The log is moved to <log>.1 (replacing the previous one) once it reaches this size
+LLM_METRICS_LOG_MAX_MB = float(os.getenv("LLM_METRICS_LOG_MAX_MB", "20"))
+# Only the end of the log is read back on startup
+LOG_TAIL_BYTES = 4 * 1024 * 1024
+
+
+def usage_counts(usage):
+    """(prompt_tokens, cached_tokens, completion_tokens) from a completion's usage; zeros when it is missing"""
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    return usage.prompt_tokens or 0, cached_tokens, usage.completion_tokens or 0
+
+
+def quantile_of(values, quantile, min_values):
+    """Value at quantile in values, or None with fewer than min_values of them"""
+    values = sorted(values)
+    if len(values) < max(1, min_values):
+        return None
+    return values[min(len(values) - 1, int(quantile * len(values)))]
+
+
+class LLMMetrics:
+    """Per-call-site record of LLM calls: token usage, provider-cached prompt tokens and latency
+
+    Totals cover this process. The most recent calls per site are also kept in
+    memory, seeded from and appended to a JSONL log so they survive restarts.
+    The log is written by a background thread, so recording a call never waits
+    on the disk, and is rotated once it reaches max_log_bytes.
+    """
+
+    def __init__(self, log_path=LLM_METRICS_LOG, history=LLM_METRICS_HISTORY,
+                 max_log_bytes=int(LLM_METRICS_LOG_MAX_MB * 1024 * 1024),
+                 quantile_ttl_seconds=LLM_METRICS_QUANTILE_TTL_SECONDS):
+        # Absolute, as the writer thread opens it later, whatever the working directory is by then
+        self.log_path = os.path.abspath(log_path) if log_path else log_path
+        self.history = history
+        self.max_log_bytes = max_log_bytes
+        self.quantile_ttl_seconds = quantile_ttl_seconds
+        self.totals = {}
+        self.recent = {}
+        # (kind, site, model, quantile, min_calls) -> (computed at, value)
+        self._quantiles = {}
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._writer = None
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self.load()
+
+    def load(self):
+        """Seed recent calls from the tail of the log, and of the rotated log before it"""
+        if not self.log_path:
+            return
+        for path in (f"{self.log_path}.1", self.log_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - LOG_TAIL_BYTES))
+                if size > LOG_TAIL_BYTES:
+                    # Skip the partial first line
+                    f.readline()
+                for line in f:
+                    try:
+                        call = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.recent.setdefault(call["site"], deque(maxlen=self.history)).append(call)
+
+    def _write_log(self):
+        """Writer thread: append queued lines to the log, rotating it when it is full"""
+        while True:
+            line = self._pending.get()
+            try:
+                if self.max_log_bytes and os.path.exists(self.log_path) and \
+                        os.path.getsize(self.log_path) >= self.max_log_bytes:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a", encoding='utf-8') as f:
+                    f.write(line)
+            except OSError:
+                # Metrics must never break a call; the line is dropped
+                pass
+            finally:
+                self._pending.task_done()
+
+    def flush(self):
+        """Wait until every recorded call is in the log"""
+        self._pending.join()
+
+    def _totals(self, site):
+        return self.totals.setdefault(site, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                                             "completion_tokens": 0, "seconds": 0.0,
+                                             "hedged": 0, "hedge_wins": 0, "timeouts": 0, "truncated": 0})
+
+    def record(self, site, model, usage, seconds, input_chars, truncated=False, hedged=False, retry=False):
+        """Record one finished call; usage is the completion's usage object (may be None)
+
+        truncated marks a call that ran out of completion budget; it counts towards
+        the totals but not towards the latency and output size history.
+
+        hedged marks a call that ran past the soft deadline and was duplicated;
+        seconds is the primary request's elapsed time when the first answer came
+        back. That is a lower bound on its real latency, at or above the
+        deadline, so the history still holds the slow tail the deadline is
+        derived from. Leaving these calls out would keep only calls that beat
+        the deadline, and each recomputed p95 would drop lower.
+
+        retry marks the request repeating a truncated call; it counts towards the
+        output size history, as its answer is complete, but not the latency history.
+        """
+        prompt_tokens, cached_tokens, completion_tokens = usage_counts(usage)
+        call = {
+            "site": site,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "seconds": round(seconds, 3),
+            "input_chars": input_chars,
+            "truncated": truncated,
+            "hedged": hedged,
+            "retry": retry,
+            "at": time.time()
+        }
+        with self._lock:
+            totals = self._totals(site)
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["seconds"] += seconds
+            totals["truncated"] += truncated
+            self.recent.setdefault(site, deque(maxlen=self.history)).append(call)
+            if self.log_path:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_log, name="llm-metrics-log", daemon=True)
+                    self._writer.start()
+                self._pending.put(json.dumps(call) + "\n")
+
+    def record_event(self, site, event):
+        """Count a hedging or deadline event for site: hedged, hedge_wins or timeouts"""
+        with self._lock:
+            self._totals(site)[event] += 1
+
+    def completed_calls(self, site, model):
+        """Recent calls from site to model that were not truncated"""
+        with self._lock:
+            return [call for call in self.recent.get(site, ())
+                    if call["model"] == model and not call.get("truncated")]
+
+    def _cached_quantile(self, key, compute):
+        """compute() for key, reused for quantile_ttl_seconds so every call does not sort the history"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._quantiles.get(key)
+        if cached is not None and now - cached[0] < self.quantile_ttl_seconds:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            self._quantiles[key] = (now, value)
+        return value
+
+    def latency_quantile(self, site, model, quantile, min_calls):
+        """Latency quantile of the recent calls from site to model, or None with fewer than min_calls of them
+
+        Retries of truncated calls are left out; hedged calls count with their primary's elapsed time.
+        """
+        def compute():
+            latencies = [call["seconds"] for call in self.completed_calls(site, model) if not call.get("retry")]
+            return quantile_of(latencies, quantile, min_calls)
+        return self._cached_quantile(("latency", site, model, quantile, min_calls), compute)
+
+    def output_ratio_quantile(self, site, model, quantile, min_calls):
+        """Quantile of completion tokens per input character over recent calls from site to model, or None"""
+        def compute():
+            ratios = [call["completion_tokens"] / call["input_chars"] for call in self.completed_calls(site, model)
+                      if call["completion_tokens"] and call["input_chars"]]
+            return quantile_of(ratios, quantile, min_calls)
+        return self._cached_quantile(("output_ratio", site, model, quantile, min_calls), compute)
+
+    def stats(self):
+        """Per-site call counts, token totals, cached prompt share, mean latency and hedging for this process"""
+        with self._lock:
+            sites = {site: dict(totals) for site, totals in self.totals.items()}
+        for totals in sites.values():
+            totals["cached_ratio"] = (totals["cached_tokens"] / totals["prompt_tokens"]
+                                      if totals["prompt_tokens"] else 0.0)
+            totals["mean_seconds"] = round(totals.pop("seconds") / totals["calls"], 3) if totals["calls"] else None
+            totals["hedge_rate"] = totals["hedged"] / totals["calls"] if totals["calls"] else 0.0
+        return {"sites": sites}
+
+
+_shared_metrics = None
+
+
+def shared_llm_metrics():
+    """Process-wide LLMMetrics used by every call site"""
+    global _shared_metrics
+    if _shared_metrics is None:
+        _shared_metrics = LLMMetrics()
+    return _shared_metrics
@@ -1,18 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import os
 import uuid
-import tempfile
-from pathlib import Path
 import uvicorn
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 import json
-
-# Import your existing CVAnalyzer class
-from streamlit_app import CVAnalyzer, read_pdf_with_pdfplumber, read_pdf_with_pypdf2, clean_and_format_text
+from dotenv import load_dotenv
+
+# Load environment variables before modules that read their configuration at import
+load_dotenv()
+
+# Import the Streamlit-free analyzer core
+from cv_analyzer import AsyncCVAnalyzer, ensure_prompt_files, is_transient_llm_error
+from pdf_extraction import PDFExtractionEngine, ExtractionTimeoutError, NoTextLayerError
+from pdf_reader import prompt_tokens_saved
+from extraction_cache import ExtractionCache
+from upload_spool import UploadSizeLimitMiddleware, UploadTooLargeError, spool_upload
+from job_queue import JOB_STATUSES, JobQueue, JobWorkerPool
+from llm_cache import shared_llm_cache
+from llm_metrics import shared_llm_metrics
+from progress import ProgressReporter
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,32 +40,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads before the multipart body is parsed
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/api/upload-cv"])
+
 # Ensure directories exist
 os.makedirs("resume", exist_ok=True)
 os.makedirs("data", exist_ok=True)
 os.makedirs("prompts", exist_ok=True)
+ensure_prompt_files()
+
+# CVAnalyzer instances keyed by (api_key, model); each keeps its own client and connection pool
+cv_analyzers = {}
+
+# PDF extraction runs in a process pool so CPU-bound parsing never blocks the event loop
+extraction_engine = PDFExtractionEngine()
+
+# Duplicate uploads are served from the extraction cache without parsing the PDF again
+extraction_cache = ExtractionCache()
+
+
+@app.on_event("startup")
+def start_extraction_engine():
+    """Pre-warm extraction workers before the first upload arrives"""
+    extraction_engine.start()
 
-# Global CVAnalyzer instance
-cv_analyzer = None
 
+@app.on_event("shutdown")
+def stop_extraction_engine():
+    """Terminate extraction workers"""
+    extraction_engine.shutdown()
 
-def get_cv_analyzer(api_key: str = None, model: str = "o1-mini"):
-    """Get CVAnalyzer instance"""
-    global cv_analyzer
+
+def get_cv_analyzer(api_key: Optional[str] = None, model: str = "o1-mini"):
+    """Get the AsyncCVAnalyzer for this API key and model"""
     if not api_key:
         api_key = os.getenv('OPENAI_API_KEY')
-    if not cv_analyzer or (api_key and cv_analyzer.client.api_key != api_key):
-        cv_analyzer = CVAnalyzer(gpt_model=model, api_key=api_key)
-    return cv_analyzer
+    key = (api_key, model)
+    if key not in cv_analyzers:
+        cv_analyzers[key] = AsyncCVAnalyzer(gpt_model=model, api_key=api_key)
+    return cv_analyzers[key]
+
+
+# Job handlers: each takes the job payload, a progress reporter and, when streaming, an on_delta callback
+async def run_analysis_job(payload, progress, on_delta=None):
+    analyzer = get_cv_analyzer(os.getenv('OPENAI_API_KEY'), payload["model"])
+    # Jobs queued before verbosity tiers existed have no verbosity
+    return await analyzer.analyze_cv(payload["cv_path"], payload["session_id"], progress,
+                                     verbosity=payload.get("verbosity", "standard"), on_delta=on_delta)
+
+
+async def run_questions_job(payload, progress, on_delta=None):
+    analyzer = get_cv_analyzer(os.getenv('OPENAI_API_KEY'), payload["model"])
+    return await analyzer.generate_questions(payload["cv_path"], payload["analysis_path"], payload["session_id"],
+                                             progress, verbosity=payload.get("verbosity", "standard"),
+                                             on_delta=on_delta)
+
+
+async def run_enhanced_resume_job(payload, progress, on_delta=None):
+    analyzer = get_cv_analyzer(os.getenv('OPENAI_API_KEY'), payload["model"])
+
+    # Call OpenAI without blocking the event loop
+    enhanced_resume = await analyzer.generate_enhanced_resume(
+        payload["cv_text"],
+        payload["analysis_text"],
+        payload["qa_data"],
+        payload["generate_resume_prompt"],
+        on_delta=on_delta
+    )
+
+    # Generate session ID
+    session_id = str(uuid.uuid4())[:8]
+
+    # Save results
+    structured_data = {
+        "session_id": session_id,
+        "cv_text": payload["cv_text"],
+        "analysis_text": payload["analysis_text"],
+        "generate_resume_prompt": payload["generate_resume_prompt"],
+        "qa_data": payload["qa_data"],
+        "enhanced_resume": enhanced_resume,
+        "model_used": payload["model"],
+        "timestamp": str(uuid.uuid4())
+    }
+
+    # Save to file
+    output_file = os.path.join("data", f"{session_id}_enhanced_cv.json")
+    with open(output_file, "w", encoding='utf-8') as f:
+        json.dump(structured_data, f, indent=2, ensure_ascii=False)
+
+    return {
+        "enhanced_resume": enhanced_resume,
+        "session_id": session_id,
+        "success": True
+    }
+
+
+# Long LLM runs go through a durable queue instead of holding the request open
+job_queue = JobQueue()
+job_workers = JobWorkerPool(job_queue, {
+    "analysis": run_analysis_job,
+    "questions": run_questions_job,
+    "enhanced_resume": run_enhanced_resume_job
+}, is_transient=is_transient_llm_error)
+
+
+@app.on_event("startup")
+def start_job_workers():
+    """Start consuming queued LLM jobs, including those left over from a previous run"""
+    job_workers.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """Stop job workers; unfinished jobs are requeued"""
+    await job_workers.stop()
+    # Do not lose call metrics still waiting for the log writer
+    shared_llm_metrics().flush()
+
+
+async def enqueue_job(kind, payload, session_id=None):
+    """Queue a job and return the 202 response body pointing at its status and result"""
+    loop = asyncio.get_running_loop()
+    job_id = await loop.run_in_executor(None, job_queue.enqueue, kind, payload, session_id)
+    job_workers.notify()
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "session_id": session_id,
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result",
+        "events_url": f"/api/jobs/{job_id}/events",
+        "success": True
+    }
+
+
+# Idle seconds before an event stream sends a keepalive comment
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# How often a job event stream reads the job's status (and sends it as a progress event)
+JOB_EVENTS_STATUS_SECONDS = float(os.getenv("JOB_EVENTS_STATUS_SECONDS", "2"))
+
+
+def format_sse(event, data):
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SSEProgressReporter(ProgressReporter):
+    """Forwards progress updates to an event stream"""
+
+    def __init__(self, emit):
+        self.emit = emit
+
+    def update(self, fraction, message):
+        self.emit("progress", {"progress": fraction, "message": message})
+
+
+def stream_job(handler, payload):
+    """Run a job handler inside the request and stream its output as Server-Sent Events
+
+    Events: "delta" ({"pass", "text"}) for every piece of LLM output, "replace"
+    ({"pass", "text"}) when a pass's final text differs from its deltas (the client
+    drops what it streamed for that pass), "progress", then "done" with the same
+    result the job endpoint returns, or "error". A ": keepalive" comment goes out
+    after SSE_KEEPALIVE_SECONDS without events so proxies keep the connection open.
+    Disconnecting the client cancels the run.
+    """
+    async def event_stream():
+        events = asyncio.Queue()
+
+        def emit(event, data):
+            events.put_nowait((event, data))
+
+        def on_delta(pass_type, text, replace=False):
+            emit("replace" if replace else "delta", {"pass": pass_type, "text": text})
+
+        task = asyncio.ensure_future(handler(payload, SSEProgressReporter(emit), on_delta))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(events.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield format_sse(*item)
+            try:
+                yield format_sse("done", task.result())
+            except Exception as e:
+                yield format_sse("error", {"detail": str(e)})
+        finally:
+            task.cancel()
+
+    # X-Accel-Buffering stops nginx from holding events back
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # Pydantic models for request/response
 class AnalysisRequest(BaseModel):
     model: str = "o1-mini"
+    # Output detail; also scales the completion token budget
+    verbosity: Literal["brief", "standard", "exhaustive"] = "standard"
 
 
 class QuestionsRequest(BaseModel):
     model: str = "o1-mini"
+    verbosity: Literal["brief", "standard", "exhaustive"] = "standard"
     cv_path: str
     analysis_path: str
     session_id: str
@@ -87,95 +279,232 @@ async def health_check():
 @app.post("/api/upload-cv")
 async def upload_cv(file: UploadFile = File(...)):
     """Upload PDF and extract text"""
-    if not file.filename.endswith('.pdf'):
+    if not file.filename or not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
     # Generate session ID
     session_id = str(uuid.uuid4())[:8]
+    spooled = None
 
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
-
-        # Extract text using your existing functions
-        text_content = read_pdf_with_pdfplumber(tmp_file_path)
-        if not text_content:
-            text_content = read_pdf_with_pypdf2(tmp_file_path)
-
-        if not text_content:
-            raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
-
-        # Clean and format text
-        cleaned_text = clean_and_format_text(text_content)
-
-        # Save extracted text
+        # Stream the upload into a bounded spool, hashing it as it arrives
+        spooled = await spool_upload(file)
         extracted_file_path = f"resume/cv{session_id}_extracted.txt"
-        with open(extracted_file_path, "w", encoding='utf-8') as f:
-            f.write(cleaned_text)
 
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
+        cached = extraction_cache.get_file(spooled.digest, extracted_file_path)
+        cache_hit = cached is not None
+        if cache_hit:
+            truncated = cached.get("truncated")
+            tokens_saved = cached.get("tokens_saved", {})
+        else:
+            # Small uploads are handed over as bytes; larger ones as the spool's temp file
+            extraction = await extraction_engine.extract(spooled.source(), extracted_file_path)
+            truncated = extraction["truncated"]
+            # Prompt tokens no longer spent on duplicated tables and repeated page furniture
+            tokens_saved = prompt_tokens_saved(extraction["stats"])
+
+            if not extraction["characters"]:
+                if os.path.exists(extracted_file_path):
+                    os.unlink(extracted_file_path)
+                raise HTTPException(status_code=500, detail="Failed to extract text from PDF")
+
+            # Time and resource cut-offs vary run to run, so only complete or page-capped text is cached
+            if truncated in (None, "page_limit"):
+                extraction_cache.put_file(spooled.digest, extracted_file_path, extraction["characters"],
+                                          extraction["seconds"], truncated, tokens_saved)
+
+        # The response carries the full text for the frontend preview
+        with open(extracted_file_path, "r", encoding='utf-8') as f:
+            cleaned_text = f.read()
 
         return {
             "session_id": session_id,
             "extracted_cv_path": extracted_file_path,
             "text_preview": cleaned_text,
             "character_count": len(cleaned_text),
+            "cache_hit": cache_hit,
+            "truncated": truncated is not None,
+            "truncated_reason": truncated,
+            "table_tokens_saved": tokens_saved.get("tables", 0),
+            "normalization_tokens_saved": tokens_saved.get("normalization", 0),
             "success": True
         }
 
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except NoTextLayerError as e:
+        raise HTTPException(status_code=422, detail={"code": e.code, "message": str(e)})
+    except ExtractionTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        # Release the spooled upload and its temporary file
+        if spooled is not None:
+            spooled.close()
 
 
-# Analyze CV
-@app.post("/api/analyze-cv/{session_id}")
-async def analyze_cv(session_id: str, request: AnalysisRequest):
-    """Analyze CV using your existing CVAnalyzer"""
-    try:
-        # Get CVAnalyzer instance
-        api_key = os.getenv('OPENAI_API_KEY')
+# Extraction statistics
+@app.get("/api/extraction/stats")
+async def get_extraction_stats():
+    """Extraction cache and engine counters for this worker"""
+    return {"cache": extraction_cache.stats(), "engine": extraction_engine.report()}
 
-        analyzer = get_cv_analyzer(api_key, request.model)
 
-        # Path to extracted CV
-        cv_path = f"resume/cv{session_id}_extracted.txt"
+# LLM response cache statistics
+@app.get("/api/llm-cache/stats")
+def get_llm_cache_stats():
+    """LLM response cache hit ratios per call site for this worker"""
+    return shared_llm_cache().stats()
 
-        if not os.path.exists(cv_path):
-            raise HTTPException(status_code=404, detail="CV file not found. Please upload first.")
 
-        # Run analysis using your existing method
-        results = analyzer.analyze_cv(cv_path, session_id)
+# LLM call metrics
+@app.get("/api/llm/metrics")
+async def get_llm_metrics():
+    """Per-pass token usage, provider-cached prompt share and latency for this worker"""
+    return shared_llm_metrics().stats()
 
-        return results
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+# Analyze CV
+@app.post("/api/analyze-cv/{session_id}", status_code=202)
+async def analyze_cv(session_id: str, request: AnalysisRequest):
+    """Queue a CV analysis; poll /api/jobs/{job_id} for progress"""
+    # Path to extracted CV
+    cv_path = f"resume/cv{session_id}_extracted.txt"
 
-# Generate questions
-@app.post("/api/generate-questions")
-async def generate_questions(request: QuestionsRequest):
-    """Generate questions using your existing method"""
-    try:
-        # Get CVAnalyzer instance
-        api_key = os.getenv('OPENAI_API_KEY')
-        analyzer = get_cv_analyzer(api_key, request.model)
+    if not os.path.exists(cv_path):
+        raise HTTPException(status_code=404, detail="CV file not found. Please upload first.")
 
-        # Generate questions using your existing method
-        results = analyzer.generate_questions(
-            request.cv_path,
-            request.analysis_path,
-            request.session_id
-        )
+    return await enqueue_job("analysis", {"cv_path": cv_path, "session_id": session_id, **request.model_dump()},
+                             session_id)
 
-        return results
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Question generation failed: {str(e)}")
+# Generate questions
+@app.post("/api/generate-questions", status_code=202)
+async def generate_questions(request: QuestionsRequest):
+    """Queue interview question generation; poll /api/jobs/{job_id} for progress"""
+    if not os.path.exists(request.cv_path) or not os.path.exists(request.analysis_path):
+        raise HTTPException(status_code=404, detail="CV or analysis file not found")
+
+    return await enqueue_job("questions", request.model_dump(), request.session_id)
+
+
+# Streaming variants: same work and saved files, output forwarded as it is generated
+@app.post("/api/analyze-cv/{session_id}/stream")
+async def stream_analyze_cv(session_id: str, request: AnalysisRequest):
+    """Analyze a CV, streaming each pass's output as Server-Sent Events"""
+    cv_path = f"resume/cv{session_id}_extracted.txt"
+
+    if not os.path.exists(cv_path):
+        raise HTTPException(status_code=404, detail="CV file not found. Please upload first.")
+
+    return stream_job(run_analysis_job, {"cv_path": cv_path, "session_id": session_id, **request.model_dump()})
+
+
+@app.post("/api/generate-questions/stream")
+async def stream_generate_questions(request: QuestionsRequest):
+    """Generate interview questions, streamed as Server-Sent Events"""
+    if not os.path.exists(request.cv_path) or not os.path.exists(request.analysis_path):
+        raise HTTPException(status_code=404, detail="CV or analysis file not found")
+
+    return stream_job(run_questions_job, request.model_dump())
+
+
+# Job status and results
+@app.get("/api/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Recent jobs with their status and timings, plus counts per status"""
+    if status and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(JOB_STATUSES)}")
+    return {"counts": job_queue.counts(), "jobs": job_queue.list(status, min(max(limit, 1), 500))}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, progress and timings of a job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """Result of a finished job; 202 with the job status while it is still queued or running"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Job failed: {job['error']}")
+    if job["status"] != "done":
+        return JSONResponse(status_code=202, content=job)
+    return job_queue.result(job_id)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Follow a queued job as Server-Sent Events (GET, so browsers can use EventSource)
+
+    Events: "delta" and "replace" as from the streaming endpoints, while the job
+    runs in this process (earlier output is replayed first); "reset" when the job
+    starts over after a retry, so the client drops the output it has; "progress"
+    ({"status", "progress", "message"}) every JOB_EVENTS_STATUS_SECONDS, read
+    from the job row; then "done" with the job result, or "failed" ({"detail"}),
+    as EventSource reserves "error" for connection errors. A job running in
+    another process sends no output, only progress and the final event.
+    """
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, job_queue.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        output = listener = None
+        followed = False
+        next_status_at = 0.0
+        try:
+            while True:
+                # Step 1: Follow the job's output once it runs here
+                if listener is None and job_id in job_workers.outputs:
+                    output = job_workers.outputs[job_id]
+                    events, listener = output.subscribe()
+                    if followed:
+                        yield format_sse("reset", {})
+                    followed = True
+                    for event in events:
+                        yield format_sse(*event)
+                # Step 2: Forward output until the next status read is due
+                if listener is not None:
+                    try:
+                        event = await asyncio.wait_for(listener.get(), max(0.0, next_status_at - loop.time()))
+                    except asyncio.TimeoutError:
+                        event = ()
+                    if event:
+                        yield format_sse(*event)
+                        continue
+                    if event is None:
+                        output.unsubscribe(listener)
+                        output = listener = None
+                elif loop.time() < next_status_at:
+                    await asyncio.sleep(next_status_at - loop.time())
+                    continue
+                # Step 3: Read the job row; finish on a final status
+                job = await loop.run_in_executor(None, job_queue.get, job_id)
+                if job["status"] == "done":
+                    yield format_sse("done", await loop.run_in_executor(None, job_queue.result, job_id))
+                    return
+                if job["status"] == "failed":
+                    yield format_sse("failed", {"detail": job["error"]})
+                    return
+                yield format_sse("progress", {key: job[key] for key in ("status", "progress", "message")})
+                next_status_at = loop.time() + JOB_EVENTS_STATUS_SECONDS
+        finally:
+            if listener is not None:
+                output.unsubscribe(listener)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # Get analysis results
@@ -217,58 +546,16 @@ class EnhancedResumeRequest(BaseModel):
     generate_resume_prompt: str
 
 
-@app.post("/api/generate-enhanced-resume")
+@app.post("/api/generate-enhanced-resume", status_code=202)
 async def generate_enhanced_resume(request: EnhancedResumeRequest):
-    """Generate enhanced resume based on Q&A responses"""
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        analyzer = get_cv_analyzer(api_key, request.model)
-
-        # Format Q&A responses
-        qa_text = "\n\nDETAILED QUESTION-ANSWER RESPONSES:\n"
-        for i, (question, answer) in enumerate(request.qa_data.items(), 1):
-            qa_text += f"\nQ{i}: {question}\nA{i}: {answer}\n"
+    """Queue enhanced resume generation from Q&A responses; poll /api/jobs/{job_id} for the result"""
+    return await enqueue_job("enhanced_resume", request.model_dump())
 
-        # Combine all inputs
-        combined_input = f"{request.generate_resume_prompt}\n\nORIGINAL CV:\n{request.cv_text}\n\nCOMPREHENSIVE ANALYSIS:\n{request.analysis_text}{qa_text}"
 
-        # Call OpenAI
-        response = analyzer.client.chat.completions.create(
-            model=analyzer.gpt_model,
-            messages=[{"role": "user", "content": combined_input}],
-            max_completion_tokens=65000
-        )
-
-        enhanced_resume = response.choices[0].message.content.strip()
-
-        # Generate session ID
-        session_id = str(uuid.uuid4())[:8]
-
-        # Save results
-        structured_data = {
-            "session_id": session_id,
-            "cv_text": request.cv_text,
-            "analysis_text": request.analysis_text,
-            "generate_resume_prompt": request.generate_resume_prompt,
-            "qa_data": request.qa_data,
-            "enhanced_resume": enhanced_resume,
-            "model_used": request.model,
-            "timestamp": str(uuid.uuid4())
-        }
-
-        # Save to file
-        output_file = os.path.join("data", f"{session_id}_enhanced_cv.json")
-        with open(output_file, "w", encoding='utf-8') as f:
-            json.dump(structured_data, f, indent=2, ensure_ascii=False)
-
-        return {
-            "enhanced_resume": enhanced_resume,
-            "session_id": session_id,
-            "success": True
-        }
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating resume: {str(e)}")
+@app.post("/api/generate-enhanced-resume/stream")
+async def stream_generate_enhanced_resume(request: EnhancedResumeRequest):
+    """Generate an enhanced resume, streamed as Server-Sent Events"""
+    return stream_job(run_enhanced_resume_job, request.model_dump())
 
 
 # Serve static files (optional, if you want to serve HTML from the same container)
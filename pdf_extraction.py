@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pdf_reader import (
+    BACKEND_FALLBACKS,
+    PARALLEL_MIN_PAGES,
+    PDF_EXTRACTION_BACKEND,
+    inspect_pdf,
+    preload_pdf_libraries,
+    split_page_ranges,
+    concatenate_text_files,
+    prompt_tokens_saved,
+)
+from pdf_sandbox import PDF_MAX_PAGES, extract_race, extract_sandboxed, pdf_process_context, start_sandbox_server
+
+# Extraction engine configuration
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "2"))
+PDF_EXTRACTION_TIMEOUT = float(os.getenv("PDF_EXTRACTION_TIMEOUT", "120"))
+# "fallback" tries backends one after another; "race" runs the backend and PyPDF2 at once
+PDF_EXTRACTION_STRATEGY = os.getenv("PDF_EXTRACTION_STRATEGY", "fallback")
+
+
+class ExtractionTimeoutError(Exception):
+    """Raised when a PDF extraction job exceeds its time budget"""
+
+
+class NoTextLayerError(Exception):
+    """Raised when a PDF has no text layer (a scanned, image-only document)"""
+    code = "no_text_layer"
+
+
+def _warm_worker():
+    """Pool initializer - import the PDF stack and start the sandbox fork server once per worker"""
+    preload_pdf_libraries()
+    start_sandbox_server()
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def extract_pdf_job(pdf_file, output_path, backend=PDF_EXTRACTION_BACKEND, inspection=None):
+    """Stream cleaned text of one PDF into output_path from a sandbox, falling back to PyPDF2 last"""
+    return extract_sandboxed(pdf_file, output_path, BACKEND_FALLBACKS[backend], inspection=inspection)
+
+
+def extract_race_job(pdf_file, output_path, backend=PDF_EXTRACTION_BACKEND, inspection=None):
+    """Race the backend against PyPDF2 in sandboxes and keep the first acceptable text"""
+    return extract_race(pdf_file, output_path, list(dict.fromkeys([backend, "pypdf2"])), inspection=inspection)
+
+
+def extract_page_range_job(pdf_file, first_page, last_page, output_path, backend=PDF_EXTRACTION_BACKEND,
+                           inspection=None):
+    """Stream cleaned text of one page range of a long PDF into output_path from a sandbox"""
+    return extract_sandboxed(pdf_file, output_path, [backend], first_page, last_page, inspection=inspection)
+
+
+class PDFExtractionEngine:
+    """Runs CPU-bound PDF extraction in a pre-warmed process pool"""
+
+    def __init__(self, max_workers=PDF_EXTRACTION_WORKERS, job_timeout=PDF_EXTRACTION_TIMEOUT,
+                 backend=PDF_EXTRACTION_BACKEND, strategy=PDF_EXTRACTION_STRATEGY):
+        self.max_workers = max(1, max_workers)
+        self.job_timeout = job_timeout
+        self.backend = backend
+        self.strategy = strategy
+        # Page counters reported by extraction jobs, summed over this process's lifetime
+        self.stats = {}
+        self._executor = None
+
+    def start(self):
+        """Create the pool and wait until every worker has imported the PDF stack"""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=pdf_process_context(),
+            initializer=_warm_worker
+        )
+        warmup = [self._executor.submit(_worker_pid) for _ in range(self.max_workers)]
+        for future in warmup:
+            future.result()
+
+    def shutdown(self):
+        """Stop the pool, cancelling queued jobs"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool without blocking the event loop, bounded by job_timeout"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, func, *args)
+            return await asyncio.wait_for(future, timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            # The worker finishes the abandoned job in the background; the caller is released now
+            raise ExtractionTimeoutError(f"PDF extraction exceeded {self.job_timeout:.0f}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OOM killer); replace the pool for later jobs
+            self.shutdown()
+            raise
+
+    def record_stats(self, extraction):
+        """Add counters reported by an extraction job to the engine totals"""
+        for name, value in extraction["stats"].items():
+            self.stats[name] = self.stats.get(name, 0) + value
+        if extraction["truncated"]:
+            name = f"truncated_{extraction['truncated']}"
+            self.stats[name] = self.stats.get(name, 0) + 1
+        if "race" in extraction and extraction["backend"]:
+            name = f"race_won_{extraction['backend']}"
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def reject_no_text_layer(self):
+        """Count an image-only PDF and raise NoTextLayerError"""
+        self.stats["no_text_layer_documents"] = self.stats.get("no_text_layer_documents", 0) + 1
+        raise NoTextLayerError("The PDF has no text layer (scanned or image-only); upload a text-based PDF")
+
+    def report(self):
+        """Engine counters plus estimated prompt tokens saved
+
+        Table pre-check savings are not estimated here: the tiered backend only
+        sends pages that look like tables to pdfplumber, so few pages are ever
+        skipped. Measure them with `python benchmark.py tables`.
+        """
+        report = dict(self.stats)
+        report["tokens_saved"] = prompt_tokens_saved(self.stats)
+        return report
+
+    async def extract(self, pdf_file, output_path):
+        """Extract cleaned text from a PDF (path or bytes) into output_path in worker processes
+
+        Every job runs in a resource-limited sandbox; "truncated" is set when a
+        page, time, CPU or memory budget cut the text short. Image-only PDFs
+        raise NoTextLayerError before any backend runs. With more than one
+        worker the PDF is inspected up front and the result handed to the
+        sandboxes, so each document is inspected once.
+        """
+        inspection = None
+        if self.max_workers > 1:
+            try:
+                inspection = await self.run(inspect_pdf, pdf_file)
+            except (ExtractionTimeoutError, BrokenProcessPool):
+                raise
+            except Exception:
+                # Let the sandbox inspect it again and report the error from there
+                inspection = None
+            if inspection is not None and not inspection["text_layer"]:
+                self.reject_no_text_layer()
+            if inspection is not None and inspection["pages"] >= 2 * PARALLEL_MIN_PAGES:
+                extraction = await self.extract_parallel(pdf_file, inspection["pages"], output_path, inspection)
+                if extraction["characters"]:
+                    return extraction
+        job = extract_race_job if self.strategy == "race" else extract_pdf_job
+        extraction = await self.run(job, pdf_file, output_path, self.backend, inspection)
+        if extraction["no_text_layer"]:
+            self.reject_no_text_layer()
+        self.record_stats(extraction)
+        return extraction
+
+    async def extract_parallel(self, pdf_file, page_count, output_path, inspection=None):
+        """Spread page ranges of a long PDF across workers and merge them in page order"""
+        start_time = time.perf_counter()
+        truncated = "page_limit" if page_count > PDF_MAX_PAGES else None
+        pages_to_read = min(page_count, PDF_MAX_PAGES)
+        ranges = split_page_ranges(pages_to_read, min(self.max_workers, pages_to_read // PARALLEL_MIN_PAGES))
+        part_paths = [f"{output_path}.part{i}" for i in range(len(ranges))]
+        try:
+            results = await asyncio.gather(
+                *(self.run(extract_page_range_job, pdf_file, first_page, last_page, part_path, self.backend,
+                           inspection)
+                  for (first_page, last_page), part_path in zip(ranges, part_paths)),
+                return_exceptions=True
+            )
+            # Any failed range falls back to a whole-document extraction
+            failed = [result for result in results if isinstance(result, BaseException)]
+            if failed:
+                if isinstance(failed[0], (ExtractionTimeoutError, BrokenProcessPool)):
+                    raise failed[0]
+                return {"characters": 0, "backend": self.backend, "stats": {}, "truncated": None,
+                        "no_text_layer": False, "seconds": time.perf_counter() - start_time}
+            # Each range is cleaned on its own: header/footer lines are learnt from the range's first
+            # REPEAT_SCAN_PAGES pages and page markers keep absolute numbers, so only page 1 keeps its
+            # header. Joining is correct for headers that start on the first pages; a line first
+            # repeating later can be stripped from later ranges only, and a hyphenated word split
+            # across a range boundary stays split. `python benchmark.py pages` reports any difference.
+            characters = await self.run(concatenate_text_files, part_paths, output_path)
+        finally:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+        stats = {}
+        for result in results:
+            for name, value in result["stats"].items():
+                stats[name] = stats.get(name, 0) + value
+            truncated = truncated or result["truncated"]
+        extraction = {"characters": characters, "backend": self.backend, "stats": stats,
+                      "pages": page_count, "truncated": truncated, "no_text_layer": False,
+                      "seconds": time.perf_counter() - start_time}
+        self.record_stats(extraction)
+        return extraction
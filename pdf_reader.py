@@ -0,0 +1,546 @@
+import io
+import os
+import re
+import time
+from bisect import bisect_right
+from functools import partial
+from itertools import accumulate
+
+# The PDF libraries (pdfplumber, PyPDF2, pypdfium2) are imported inside the functions that use
+# them, so processes that only need the constants and text helpers do not pay for them
+
+
+# Bump whenever extraction or cleaning output changes so cached text is invalidated
+EXTRACTOR_VERSION = "8"
+
+# Default page backend: "tiered" (pdfium, escalating complex pages to pdfplumber), "pdfplumber", "pdfium" or "pypdf2"
+PDF_EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "tiered")
+
+# Table extraction on pdfplumber pages: "auto" (only pages with ruling geometry), "always" or "never"
+PDF_TABLE_EXTRACTION = os.getenv("PDF_TABLE_EXTRACTION", "auto")
+
+# Table and tiered extraction heuristics (PDF points)
+RULING_MIN_LENGTH = 10
+RULING_MAX_THICKNESS = 2
+# pdfplumber's table finder ignores edges shorter than this (its edge_min_length default)
+TABLE_EDGE_MIN_LENGTH = 3
+COLUMN_MIN_LINES = 6
+
+# Long PDFs are split into page ranges of at least this many pages per worker
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# Cleaned lines are flushed to disk in chunks of roughly this many characters
+OUTPUT_BUFFER_CHARS = 64 * 1024
+
+# Normalization: lines this close to a page's top or bottom are header/footer candidates,
+# and the first pages scanned for lines that repeat across pages
+HEADER_FOOTER_LINES = 3
+REPEAT_SCAN_PAGES = 4
+
+PAGE_MARKER_LINE = re.compile(r"^--- Page (\d+) ---$")
+TABLE_MARKER_LINE = re.compile(r"^Table \d+ from page \d+:$")
+# "Page 3", "Page 3 of 7", "Page 3/7", "3 of 7" and "- 3 -"; bare "3/7" is left alone as it reads like a date
+PAGE_NUMBER_LINE = re.compile(r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|\d+\s+of\s+\d+|-\s*\d+\s*-)$", re.IGNORECASE)
+BULLET_PREFIX = re.compile(r"^(?:\(cid:\d+\)|[\u2022\u25cf\u25aa\u25a0\u25e6\u2023\u2043\u2219\u00b7\u25cb\u25a1"
+                           r"\u27a2\u27a4\u25ba\u25b6\u2713\u2714\uf0b7\uf0a7\uf076\uf0d8])+\s*")
+HYPHENATED_END = re.compile(r"[A-Za-z]-$")
+# Page numbers inside a header/footer line ("Page 3", "3 of 7", "3/7", or a lone leading or trailing number);
+# at most three digits, so years and other numbers still tell lines apart
+PAGE_NUMBER_TOKEN = re.compile(r"page\s*\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?"
+                               r"|(?<![\d/])\d{1,3}\s*(?:of|/)\s*\d{1,3}(?![\d/])"
+                               r"|(?<!\S)\d{1,3}$|^\d{1,3}(?!\S)", re.IGNORECASE)
+
+# Text layer pre-check: characters pdfium must find on the first pages for a PDF to count as text
+TEXT_LAYER_CHECK_PAGES = 3
+TEXT_LAYER_MIN_CHARS = 20
+
+# Rough characters-per-token ratio of OpenAI tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+
+def preload_pdf_libraries():
+    """Import the PDF stack up front, e.g. in long-lived processes that fork extraction children"""
+    import pdfplumber  # noqa: F401
+    import PyPDF2  # noqa: F401
+    import pypdfium2  # noqa: F401
+    from pdfminer import layout, converter  # noqa: F401
+
+
+def count_rulings(boxes):
+    """(horizontal, vertical) ruling counts for (x0, y0, x1, y1) boxes of lines and rectangles"""
+    horizontal = vertical = 0
+    for x0, y0, x1, y1 in boxes:
+        width, height = abs(x1 - x0), abs(y1 - y0)
+        if width >= RULING_MIN_LENGTH and height <= RULING_MAX_THICKNESS:
+            horizontal += 1
+        elif height >= RULING_MIN_LENGTH and width <= RULING_MAX_THICKNESS:
+            vertical += 1
+        elif width >= RULING_MIN_LENGTH and height >= RULING_MIN_LENGTH:
+            # Rectangles (cell borders or shaded cells) contribute both orientations
+            horizontal += 2
+            vertical += 2
+    return horizontal, vertical
+
+
+def has_table_geometry(page):
+    """Cheap check on a pdfplumber page's line, rect and curve edges: could a ruled table be present?"""
+    horizontal = vertical = 0
+    for edge in page.edges:
+        if edge["orientation"] == "h" and edge["width"] >= TABLE_EDGE_MIN_LENGTH:
+            horizontal += 1
+        elif edge["orientation"] == "v" and edge["height"] >= TABLE_EDGE_MIN_LENGTH:
+            vertical += 1
+        # A table cell needs at least two edges in each direction
+        if horizontal >= 2 and vertical >= 2:
+            return True
+    return False
+
+
+def add_stat(stats, name, value=1):
+    """Increment a counter in an optional stats dict"""
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+
+def estimate_tokens(characters):
+    """Approximate prompt tokens for a number of characters"""
+    return characters // CHARS_PER_TOKEN
+
+
+def prompt_tokens_saved(stats):
+    """Estimated prompt tokens per CV saved by table de-duplication and normalization"""
+    return {
+        "tables": estimate_tokens(stats.get("table_duplicate_chars", 0)),
+        "normalization": estimate_tokens(stats.get("normalized_chars_removed", 0))
+    }
+
+
+def find_page_tables(page, stats=None, tables=PDF_TABLE_EXTRACTION):
+    """Run pdfplumber's table finder unless the page has no table geometry (or tables are disabled)"""
+    if tables == "never":
+        return []
+    if tables == "auto":
+        check_start = time.perf_counter()
+        worth_running = has_table_geometry(page)
+        add_stat(stats, "table_precheck_seconds", time.perf_counter() - check_start)
+        if not worth_running:
+            add_stat(stats, "table_pages_skipped")
+            return []
+    table_start = time.perf_counter()
+    page_tables = page.find_tables()
+    add_stat(stats, "table_pages_extracted")
+    add_stat(stats, "table_extraction_seconds", time.perf_counter() - table_start)
+    return page_tables
+
+
+def text_around_tables(page, tables, stats=None):
+    """Page text split at the tables: [text above the first table, text below it, ..., text below the last]
+
+    tables must be sorted top to bottom. Characters inside table regions are
+    left out, as they are emitted as tables instead. Text beside a table (a
+    sidebar, or the other column of a two-column page) goes with the text
+    above it, so it comes before the table.
+    """
+    if not tables:
+        return [page.extract_text()]
+    bboxes = [table.bbox for table in tables]
+    # A band ends at the bottom of a table (or of the lowest table next to it)
+    band_ends = list(accumulate((bbox[3] for bbox in bboxes), max))
+
+    def inside(obj):
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+    def in_band(obj, band):
+        if obj.get("object_type") != "char":
+            return True
+        return not inside(obj) and bisect_right(band_ends, (obj["top"] + obj["bottom"]) / 2) == band
+
+    bands = [page.filter(partial(in_band, band=band)).extract_text() for band in range(len(tables) + 1)]
+    add_stat(stats, "table_duplicate_chars", sum(1 for char in page.chars if char["text"].strip() and inside(char)))
+    return bands
+
+
+# PDF Reading Functions
+def format_pdfplumber_page(page, page_num, stats=None, tables=PDF_TABLE_EXTRACTION):
+    """Text and tables of a single pdfplumber page, with page and table markers
+
+    Table content appears once, as a table where it sits on the page; it is
+    removed from the page text.
+    """
+    parts = []
+    # Parse the page layout up front so the table pre-check timing covers only the check
+    page.objects
+    # Find tables first if the page can contain any, so their text is not repeated
+    page_tables = sorted(find_page_tables(page, stats, tables), key=lambda table: table.bbox[1])
+    bands = text_around_tables(page, page_tables, stats)
+    if any(bands) or page_tables:
+        parts.append(f"\n--- Page {page_num} ---\n{bands[0] or ''}\n")
+    for i, table in enumerate(page_tables, 1):
+        parts.append(f"\nTable {i} from page {page_num}:\n")
+        for row in table.extract():
+            parts.append("\t".join(str(cell) if cell else "" for cell in row) + "\n")
+        if bands[i]:
+            parts.append(f"\n{bands[i]}\n")
+    return "".join(parts)
+
+
+def iter_pdfplumber_pages(pdf_file, first_page=None, last_page=None, stats=None):
+    """Yield the formatted text of each page, releasing pdfplumber's page cache as it goes"""
+    import pdfplumber
+    pages = list(range(first_page, last_page + 1)) if first_page else None
+    with pdfplumber.open(pdf_file, pages=pages) as pdf:
+        for page in pdf.pages:
+            page_text = format_pdfplumber_page(page, page.page_number, stats)
+            page.close()
+            yield page_text
+
+
+def iter_pypdf2_pages(pdf_file, first_page=None, last_page=None, stats=None):
+    """Yield the formatted text of each page using PyPDF2"""
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    first_page = first_page or 1
+    last_page = last_page or len(pdf_reader.pages)
+    for page_num in range(first_page, last_page + 1):
+        page_text = pdf_reader.pages[page_num - 1].extract_text()
+        yield f"\n--- Page {page_num} ---\n{page_text}\n"
+
+
+def as_pdf_file(source):
+    """Accept a path, file object or raw PDF bytes (from an in-memory upload)"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def _pdfium_source(pdf_file):
+    """pdfium input that does not share a file position with pdfplumber"""
+    if isinstance(pdf_file, io.BytesIO):
+        return pdf_file.getvalue()
+    return pdf_file
+
+
+def format_pdfium_page(textpage, page_num):
+    """Plain text of a single pdfium page with the standard page marker"""
+    page_text = textpage.get_text_bounded()
+    if not page_text.strip():
+        return ""
+    return f"\n--- Page {page_num} ---\n{page_text}\n"
+
+
+def iter_pdfium_pages(pdf_file, first_page=None, last_page=None, stats=None):
+    """Yield the text of each page using pdfium - fast, no table or layout analysis"""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(_pdfium_source(pdf_file))
+    try:
+        first_page = first_page or 1
+        last_page = last_page or len(pdf)
+        for page_num in range(first_page, last_page + 1):
+            page = pdf[page_num - 1]
+            textpage = page.get_textpage()
+            page_text = format_pdfium_page(textpage, page_num)
+            textpage.close()
+            page.close()
+            yield page_text
+    finally:
+        pdf.close()
+
+
+def detect_complex_layout(page, textpage):
+    """Return "table" or "columns" when a pdfium page needs pdfplumber's layout analysis, else None"""
+    import pypdfium2.raw as pdfium_c
+    # Tables: at least two horizontal and two vertical rulings among the page's path objects
+    paths = page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH], max_depth=2)
+    horizontal, vertical = count_rulings(obj.get_pos() for obj in paths)
+    if horizontal >= 2 and vertical >= 2:
+        return "table"
+    # Columns: many text runs confined to each half, with the right half sharing a left margin
+    middle = page.get_width() / 2
+    left_runs = 0
+    right_starts = {}
+    for i in range(textpage.count_rects()):
+        left, _, right, _ = textpage.get_rect(i)
+        if right < middle:
+            left_runs += 1
+        elif left > middle:
+            right_starts[round(left)] = right_starts.get(round(left), 0) + 1
+    right_runs = sum(right_starts.values())
+    if left_runs >= COLUMN_MIN_LINES and right_runs >= COLUMN_MIN_LINES:
+        aligned = max(right_starts.get(x - 1, 0) + right_starts.get(x, 0) + right_starts.get(x + 1, 0)
+                      for x in right_starts)
+        if aligned >= 0.6 * right_runs:
+            return "columns"
+    return None
+
+
+def iter_tiered_pages(pdf_file, first_page=None, last_page=None, stats=None):
+    """Yield the text of each page with pdfium, escalating table and multi-column pages to pdfplumber"""
+    import pdfplumber
+    import pypdfium2 as pdfium
+    stats = stats if stats is not None else {}
+    pdf = pdfium.PdfDocument(_pdfium_source(pdf_file))
+    plumber_pdf = None
+    try:
+        first_page = first_page or 1
+        last_page = last_page or len(pdf)
+        for page_num in range(first_page, last_page + 1):
+            page = pdf[page_num - 1]
+            textpage = page.get_textpage()
+            layout = detect_complex_layout(page, textpage)
+            if layout:
+                if plumber_pdf is None:
+                    plumber_pdf = pdfplumber.open(pdf_file)
+                plumber_page = plumber_pdf.pages[page_num - 1]
+                page_text = format_pdfplumber_page(plumber_page, page_num, stats)
+                plumber_page.close()
+                stats[f"escalated_{layout}_pages"] = stats.get(f"escalated_{layout}_pages", 0) + 1
+            else:
+                page_text = format_pdfium_page(textpage, page_num)
+                stats["pdfium_pages"] = stats.get("pdfium_pages", 0) + 1
+            textpage.close()
+            page.close()
+            yield page_text
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+        pdf.close()
+
+
+# Page iterators by backend name, and the backends tried after each one fails
+PAGE_ITERATORS = {
+    "tiered": iter_tiered_pages,
+    "pdfplumber": iter_pdfplumber_pages,
+    "pdfium": iter_pdfium_pages,
+    "pypdf2": iter_pypdf2_pages,
+}
+BACKEND_FALLBACKS = {
+    "tiered": ["tiered", "pdfplumber", "pypdf2"],
+    "pdfplumber": ["pdfplumber", "pypdf2"],
+    "pdfium": ["pdfium", "pypdf2"],
+    "pypdf2": ["pypdf2"],
+}
+
+
+def count_pdf_pages(pdf_file):
+    """Number of pages in a PDF, without any layout analysis"""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(_pdfium_source(pdf_file))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def inspect_pdf(pdf_file):
+    """Page count, and whether the first pages carry a text layer (False for scanned, image-only PDFs)"""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(_pdfium_source(pdf_file))
+    try:
+        page_count = len(pdf)
+        characters = 0
+        for page_index in range(min(page_count, TEXT_LAYER_CHECK_PAGES)):
+            page = pdf[page_index]
+            textpage = page.get_textpage()
+            characters += textpage.count_chars()
+            textpage.close()
+            page.close()
+            if characters >= TEXT_LAYER_MIN_CHARS:
+                break
+        return {"pages": page_count, "text_layer": characters >= TEXT_LAYER_MIN_CHARS}
+    finally:
+        pdf.close()
+
+
+def split_page_ranges(page_count, parts):
+    """Split pages 1..page_count into up to `parts` contiguous (first, last) ranges"""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    first_page = 1
+    for i in range(parts):
+        last_page = first_page + size - 1 + (1 if i < extra else 0)
+        ranges.append((first_page, last_page))
+        first_page = last_page + 1
+    return ranges
+
+
+def iter_clean_lines(chunks):
+    """Yield stripped, non-empty lines from text chunks, rejoining lines split across chunks"""
+    partial = ""
+    for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find("\n", start)
+            if end == -1:
+                partial += chunk[start:]
+                break
+            line = (partial + chunk[start:end]).strip()
+            partial = ""
+            if line:
+                yield line
+            start = end + 1
+    line = partial.strip()
+    if line:
+        yield line
+
+
+def repeat_key(line):
+    """Line identity for header/footer matching - case and page numbers ignored, other numbers kept"""
+    return PAGE_NUMBER_TOKEN.sub("#", " ".join(line.lower().split()))
+
+
+def header_footer_zone(lines):
+    """Indexes of a page's header and footer candidate lines (tables excluded)
+
+    A table is its marker line and the tab-separated rows after it; text can
+    follow it further down the page.
+    """
+    text_lines = []
+    in_table = False
+    for i, line in enumerate(lines):
+        if TABLE_MARKER_LINE.match(line):
+            in_table = True
+        elif not (in_table and "\t" in line):
+            in_table = False
+            text_lines.append(i)
+    return set(text_lines[:HEADER_FOOTER_LINES]) | set(text_lines[-HEADER_FOOTER_LINES:])
+
+
+def find_repeated_lines(pages):
+    """Header/footer keys that occur on at least two of the scanned pages"""
+    page_counts = {}
+    for _, lines in pages:
+        for key in {repeat_key(lines[i]) for i in header_footer_zone(lines) if "\t" not in lines[i]}:
+            page_counts[key] = page_counts.get(key, 0) + 1
+    return {key for key, count in page_counts.items() if count >= 2}
+
+
+def filter_page_lines(page_num, lines, repeated, stats=None):
+    """Drop page-number lines, and repeated header/footer lines except on the first page"""
+    zone = header_footer_zone(lines)
+    for i, line in enumerate(lines):
+        if i in zone:
+            if PAGE_NUMBER_LINE.match(line) or (page_num != 1 and repeat_key(line) in repeated):
+                add_stat(stats, "repeated_lines_removed")
+                continue
+        yield line
+
+
+def iter_page_lines(lines):
+    """Group cleaned lines into (page number, lines) on our page markers, dropping the markers"""
+    page_num = None
+    page_lines = []
+    for line in lines:
+        marker = PAGE_MARKER_LINE.match(line)
+        if marker:
+            if page_lines:
+                yield page_num, page_lines
+            page_num = int(marker.group(1))
+            page_lines = []
+        else:
+            page_lines.append(line)
+    if page_lines:
+        yield page_num, page_lines
+
+
+def strip_repeated_lines(lines, stats=None):
+    """Remove page markers, page numbers and header/footer lines repeated across pages
+
+    Only the first REPEAT_SCAN_PAGES pages are buffered to learn what repeats.
+    """
+    pages = iter_page_lines(lines)
+    scanned = []
+    for page in pages:
+        scanned.append(page)
+        if len(scanned) == REPEAT_SCAN_PAGES:
+            break
+    repeated = find_repeated_lines(scanned)
+    for page_num, page_lines in scanned:
+        yield from filter_page_lines(page_num, page_lines, repeated, stats)
+    for page_num, page_lines in pages:
+        yield from filter_page_lines(page_num, page_lines, repeated, stats)
+
+
+def join_hyphenated(lines):
+    """Rejoin lines broken after a hyphen, keeping the hyphen ("cross-" + "functional")"""
+    pending = None
+    for line in lines:
+        if pending is not None:
+            if line[:1].islower():
+                line = pending + line
+            else:
+                yield pending
+            pending = None
+        if HYPHENATED_END.search(line):
+            pending = line
+        else:
+            yield line
+    if pending is not None:
+        yield pending
+
+
+def normalize_lines(lines, stats=None):
+    """Shrink cleaned lines for prompts: repeated headers/footers, markers, hyphenation and bullets"""
+    input_chars = 0
+    output_chars = 0
+
+    def counted(lines):
+        nonlocal input_chars
+        for line in lines:
+            input_chars += len(line) + 1
+            yield line
+
+    bulleted = (BULLET_PREFIX.sub("- ", line) for line in strip_repeated_lines(counted(lines), stats))
+    for line in join_hyphenated(bulleted):
+        output_chars += len(line) + 1
+        yield line
+    add_stat(stats, "normalized_chars_removed", input_chars - output_chars)
+
+
+def clean_and_format_text(text):
+    """Clean and format the extracted text"""
+    if not text:
+        return ""
+    return '\n'.join(normalize_lines(iter_clean_lines([text])))
+
+
+def write_clean_text(chunks, output_path, stats=None):
+    """Stream cleaned, normalized lines from text chunks into output_path; returns the characters written"""
+    characters = 0
+    buffer = []
+    buffered = 0
+    with open(output_path, "w", encoding='utf-8') as f:
+        for line in normalize_lines(iter_clean_lines(chunks), stats):
+            if characters:
+                buffer.append("\n")
+                buffered += 1
+            buffer.append(line)
+            buffered += len(line)
+            characters += (1 if characters else 0) + len(line)
+            if buffered >= OUTPUT_BUFFER_CHARS:
+                f.write("".join(buffer))
+                buffer = []
+                buffered = 0
+        f.write("".join(buffer))
+    return characters
+
+
+def concatenate_text_files(part_paths, output_path):
+    """Join cleaned text files in order with newlines, skipping empty parts; returns characters written"""
+    characters = 0
+    with open(output_path, "w", encoding='utf-8') as out:
+        for part_path in part_paths:
+            with open(part_path, "r", encoding='utf-8') as part:
+                block = part.read(OUTPUT_BUFFER_CHARS)
+                if not block:
+                    continue
+                if characters:
+                    out.write("\n")
+                    characters += 1
+                while block:
+                    out.write(block)
+                    characters += len(block)
+                    block = part.read(OUTPUT_BUFFER_CHARS)
+    return characters
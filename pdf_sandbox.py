@@ -0,0 +1,321 @@
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import resource
+except ImportError:  # not available on Windows; the sandbox then only enforces page and time budgets
+    resource = None  # type: ignore[assignment]
+
+from pdf_reader import (
+    BACKEND_FALLBACKS,
+    PAGE_ITERATORS,
+    PDF_EXTRACTION_BACKEND,
+    as_pdf_file,
+    inspect_pdf,
+    write_clean_text,
+)
+
+# Sandbox budgets
+PDF_SANDBOX_CPU_SECONDS = int(os.getenv("PDF_SANDBOX_CPU_SECONDS", "60"))
+PDF_SANDBOX_MEMORY_MB = int(os.getenv("PDF_SANDBOX_MEMORY_MB", "1024"))
+PDF_SANDBOX_WALL_SECONDS = float(os.getenv("PDF_SANDBOX_WALL_SECONDS", "90"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "200"))
+# How often a waiting sandbox checks whether it has been cancelled
+CANCEL_POLL_SECONDS = 0.05
+
+# Minimum quality for a raced extraction to be accepted
+QUALITY_MIN_CHARACTERS = 200
+QUALITY_MIN_PRINTABLE_RATIO = 0.95
+QUALITY_MIN_PAGE_COVERAGE = 0.8
+
+PAGE_MARKER_PATTERN = re.compile(r"--- Page \d+ ---")
+
+# Modules the fork server imports once, so every sandbox starts with the PDF stack loaded
+SANDBOX_PRELOAD = ["__main__", "pdf_sandbox", "pdfplumber", "PyPDF2", "pypdfium2", "pdfminer.layout",
+                   "pdfminer.converter"]
+
+
+def pdf_process_context():
+    """Multiprocessing context for sandboxes and extraction workers: a fork server, else spawn
+
+    Forking the calling process directly is unsafe once it runs threads (the
+    API's executors, extract_race); the fork server is a single-threaded
+    process that preloaded SANDBOX_PRELOAD, so children still start fast.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(SANDBOX_PRELOAD)
+    return context
+
+
+def start_sandbox_server():
+    """Start the fork server now instead of on the first extraction"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        pdf_process_context()
+        from multiprocessing import forkserver
+        forkserver.ensure_running()
+
+
+def limit_resources(cpu_seconds, memory_mb):
+    """Cap CPU time and address space of the current process"""
+    if resource is None:
+        return
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    # The child starts with the fork server's address space (the preloaded PDF stack), so the budget goes on top
+    try:
+        with open("/proc/self/statm") as f:
+            current_bytes = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current_bytes = 0
+    limit = current_bytes + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _sandbox_child(conn, pdf_file, backends, first_page, last_page, cpu_seconds, memory_mb, inspection=None):
+    """Sandbox process body: apply limits, then send page text back over conn
+
+    The PDF is inspected here unless the caller already passed inspect_pdf's result.
+
+    Messages: ("start", {...}) before each backend, ("page", text) per page,
+    ("end", {...}) after each backend, ("limit", reason) when out of memory and
+    ("no_text_layer", pages) for whole documents without a text layer.
+    """
+    limit_resources(cpu_seconds, memory_mb)
+    truncated = None
+    try:
+        if inspection is None:
+            inspection = inspect_pdf(pdf_file)
+        page_count = inspection["pages"]
+        if first_page is None and not inspection["text_layer"]:
+            # Image-only PDF: no backend would find text, so skip them all
+            conn.send(("no_text_layer", page_count))
+            return
+        if last_page is None:
+            last_page = min(page_count, PDF_MAX_PAGES)
+            if page_count > PDF_MAX_PAGES:
+                truncated = "page_limit"
+        for backend in backends:
+            if hasattr(pdf_file, "seek"):
+                pdf_file.seek(0)
+            conn.send(("start", {"backend": backend, "pages": page_count, "truncated": truncated}))
+            stats = {}
+            has_text = False
+            error = None
+            try:
+                for chunk in PAGE_ITERATORS[backend](pdf_file, first_page, last_page, stats):
+                    has_text = has_text or bool(chunk.strip())
+                    conn.send(("page", chunk))
+            except MemoryError:
+                raise
+            except Exception as e:
+                error = str(e)
+            conn.send(("end", {"stats": stats, "error": error}))
+            if has_text and error is None:
+                break
+    except MemoryError:
+        conn.send(("limit", "memory_limit"))
+    except Exception as e:
+        conn.send(("end", {"stats": {}, "error": str(e)}))
+    finally:
+        conn.close()
+
+
+def _receive(conn, process, deadline, cancel=None):
+    """Next message from the sandbox, or ("limit", reason) on timeout, cancellation or abnormal exit"""
+    while True:
+        if cancel is not None and cancel.is_set():
+            return ("limit", "cancelled")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ("limit", "time_limit")
+        if conn.poll(remaining if cancel is None else min(remaining, CANCEL_POLL_SECONDS)):
+            break
+    try:
+        return conn.recv()
+    except EOFError:
+        process.join()
+        if process.exitcode == 0:
+            return ("exit", None)
+        if process.exitcode == -signal.SIGXCPU:
+            return ("limit", "cpu_limit")
+        if process.exitcode == -signal.SIGKILL:
+            # The CPU hard limit or the kernel's OOM killer; neither can be told apart here
+            return ("limit", "killed")
+        return ("limit", f"exit_{process.exitcode}")
+
+
+def _receive_pages(conn, process, deadline, state, cancel=None):
+    """Yield page text until the sandbox sends anything else, which is left in state"""
+    state["text_pages"] = 0
+    while True:
+        message = _receive(conn, process, deadline, cancel)
+        if message[0] != "page":
+            state["message"] = message
+            return
+        if PAGE_MARKER_PATTERN.sub("", message[1]).strip():
+            state["text_pages"] += 1
+        yield message[1]
+
+
+def extract_sandboxed(pdf_file, output_path, backends=None, first_page=None, last_page=None,
+                      wall_seconds=PDF_SANDBOX_WALL_SECONDS, cpu_seconds=PDF_SANDBOX_CPU_SECONDS,
+                      memory_mb=PDF_SANDBOX_MEMORY_MB, cancel=None, inspection=None):
+    """Extract cleaned text into output_path from a resource-limited child process
+
+    Backends are tried in order until one yields text. Whole-document runs
+    stop after PDF_MAX_PAGES pages. When a budget runs out the text received so
+    far is kept and "truncated" names the budget: page_limit, time_limit,
+    cpu_limit or memory_limit, or "killed" when the child got SIGKILL. "no_text_layer" is set, without running any
+    backend, when a whole document's first pages have no text layer. Setting
+    the cancel event kills the child. Pass inspection (inspect_pdf's result)
+    when it is already known so the child does not inspect the PDF again.
+    """
+    start_time = time.perf_counter()
+    deadline = time.monotonic() + wall_seconds
+    backends = backends or BACKEND_FALLBACKS[PDF_EXTRACTION_BACKEND]
+    context = pdf_process_context()
+    receive_conn, send_conn = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_sandbox_child,
+        args=(send_conn, as_pdf_file(pdf_file), backends, first_page, last_page, cpu_seconds, memory_mb,
+              inspection),
+        daemon=True
+    )
+    process.start()
+    send_conn.close()
+
+    extraction = {"characters": 0, "backend": None, "stats": {}, "pages": None, "text_pages": 0, "truncated": None,
+                  "no_text_layer": False}
+    try:
+        message = _receive(receive_conn, process, deadline, cancel)
+        while message[0] == "start":
+            extraction["backend"] = message[1]["backend"]
+            extraction["pages"] = message[1]["pages"]
+            extraction["truncated"] = message[1]["truncated"]
+            state = {}
+            # Normalization counters only describe the attempt whose text is kept
+            write_stats = {}
+            extraction["characters"] = write_clean_text(
+                _receive_pages(receive_conn, process, deadline, state, cancel), output_path, write_stats
+            )
+            extraction["text_pages"] = state["text_pages"]
+            message = state["message"]
+            if message[0] != "end":
+                break
+            for name, value in message[1]["stats"].items():
+                extraction["stats"][name] = extraction["stats"].get(name, 0) + value
+            if message[1]["error"]:
+                print(f"Error reading PDF with {extraction['backend']}: {message[1]['error']}")
+            elif extraction["characters"]:
+                break
+            message = _receive(receive_conn, process, deadline, cancel)
+        if message[0] == "limit":
+            extraction["truncated"] = message[1]
+        elif message[0] == "no_text_layer":
+            extraction["no_text_layer"] = True
+            extraction["pages"] = message[1]
+        if extraction["backend"] is not None:
+            for name, value in write_stats.items():
+                extraction["stats"][name] = extraction["stats"].get(name, 0) + value
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receive_conn.close()
+
+    if not extraction["characters"] and not extraction["truncated"]:
+        extraction["backend"] = None
+    extraction["seconds"] = time.perf_counter() - start_time
+    return extraction
+
+
+def printable_ratio(text_path):
+    """Share of printable characters (whitespace included) in a text file"""
+    total = 0
+    printable = 0
+    with open(text_path, "r", encoding='utf-8') as f:
+        for block in iter(lambda: f.read(64 * 1024), ""):
+            total += len(block)
+            printable += sum(1 for char in block if char.isprintable() or char.isspace())
+    return printable / total if total else 0.0
+
+
+def extraction_quality(extraction, output_path, first_page=None, last_page=None):
+    """Quick quality check of a finished extraction: (passed, scores)"""
+    if last_page is not None:
+        expected_pages = last_page - (first_page or 1) + 1
+    else:
+        expected_pages = min(extraction["pages"] or 0, PDF_MAX_PAGES)
+    scores = {
+        "characters": extraction["characters"],
+        "printable_ratio": round(printable_ratio(output_path), 4) if extraction["characters"] else 0.0,
+        "page_coverage": round(extraction["text_pages"] / expected_pages, 4) if expected_pages else 0.0
+    }
+    passed = (
+        scores["characters"] >= QUALITY_MIN_CHARACTERS
+        and scores["printable_ratio"] >= QUALITY_MIN_PRINTABLE_RATIO
+        and scores["page_coverage"] >= QUALITY_MIN_PAGE_COVERAGE
+        and extraction["truncated"] in (None, "page_limit")
+    )
+    return passed, scores
+
+
+def extract_race(pdf_file, output_path, backends, **limits):
+    """Run one sandbox per backend at once and keep the first result that passes extraction_quality
+
+    The other sandboxes are cancelled. If none passes, the result with the
+    most characters is kept. "race" in the result has each backend's scores.
+    """
+    start_time = time.perf_counter()
+    cancels = {backend: threading.Event() for backend in backends}
+    race_paths = {backend: f"{output_path}.{backend}" for backend in backends}
+    finished = {}
+    winner = None
+    try:
+        with ThreadPoolExecutor(max_workers=len(backends)) as executor:
+            futures = {
+                executor.submit(extract_sandboxed, pdf_file, race_paths[backend], [backend],
+                                cancel=cancels[backend], **limits): backend
+                for backend in backends
+            }
+            for future in as_completed(futures):
+                backend = futures[future]
+                extraction = future.result()
+                if extraction["truncated"] == "cancelled":
+                    continue
+                if extraction["no_text_layer"]:
+                    # Every backend would read the same empty text layer
+                    for cancel in cancels.values():
+                        cancel.set()
+                    return extraction
+                passed, scores = extraction_quality(extraction, race_paths[backend])
+                extraction["race"] = {backend: dict(scores, passed=passed,
+                                                    seconds=round(extraction["seconds"], 3))}
+                finished[backend] = extraction
+                if passed and winner is None:
+                    winner = backend
+                    for other, cancel in cancels.items():
+                        if other != backend:
+                            cancel.set()
+        if winner is None and finished:
+            winner = max(finished, key=lambda backend: finished[backend]["characters"])
+        if winner is not None and finished[winner]["characters"]:
+            os.replace(race_paths[winner], output_path)
+            extraction = finished[winner]
+            for backend, other in finished.items():
+                extraction["race"].update(other["race"])
+        else:
+            extraction = {"characters": 0, "backend": None, "stats": {}, "pages": None, "text_pages": 0,
+                          "truncated": None, "no_text_layer": False, "race": {}}
+    finally:
+        for race_path in race_paths.values():
+            if os.path.exists(race_path):
+                os.remove(race_path)
+    extraction["seconds"] = time.perf_counter() - start_time
+    return extraction
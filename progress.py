@@ -0,0 +1,15 @@
+class ProgressReporter:
+    """Receives analysis progress; the base class ignores it (headless runs, API requests)"""
+
+    def update(self, fraction, message):
+        """Report overall progress as a 0..1 fraction with a status message"""
+
+
+class ConsoleProgressReporter(ProgressReporter):
+    """Prints progress lines prefixed with a job label"""
+
+    def __init__(self, label):
+        self.label = label
+
+    def update(self, fraction, message):
+        print(f"[{self.label}] {fraction:>4.0%} {message}", flush=True)
@@ -6,6 +6,8 @@ import re
 from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
+from cv_analyzer import LLM_HARD_TIMEOUT_SECONDS, build_enhanced_resume_input
+from llm_cache import cached_completion
 # Load environment variables
 load_dotenv()
 # Configure page
@@ -44,7 +46,7 @@ def check_password():
             key="password",
             placeholder="Enter password"
         )
-        if st.session_state.get("authenticated") == False:
+        if st.session_state.get("authenticated") is False:
             st.error("Incorrect password. Please try again.")
     return False
 
@@ -149,20 +151,12 @@ def parse_questions_from_text(questions_text):
 def generate_enhanced_resume(cv_text, analysis_text, qa_data, generate_resume_prompt, api_key, gpt_model="o1-mini"):
     """Generate enhanced resume using OpenAI"""
     try:
-        client = OpenAI(api_key=api_key)
-        # Format Q&A responses
-        qa_text = "\n\nDETAILED QUESTION-ANSWER RESPONSES:\n"
-        for i, (question, answer) in enumerate(qa_data.items(), 1):
-            qa_text += f"\nQ{i}: {question}\nA{i}: {answer}\n"
-        # Combine all inputs
-        combined_input = f"{generate_resume_prompt}\n\nORIGINAL CV:\n{cv_text}\n\nCOMPREHENSIVE ANALYSIS:\n{analysis_text}{qa_text}"
-        # Call OpenAI
-        response = client.chat.completions.create(
-            model=gpt_model,
-            messages=[{"role": "user", "content": combined_input}],
-            max_completion_tokens=65000
-        )
-        return response.choices[0].message.content.strip()
+        client = OpenAI(api_key=api_key, timeout=LLM_HARD_TIMEOUT_SECONDS)
+        # Combine all inputs (CV first, instructions last)
+        combined_input = build_enhanced_resume_input(cv_text, analysis_text, qa_data, generate_resume_prompt)
+        # Call OpenAI (identical earlier requests are answered from the LLM cache)
+        return cached_completion(client, gpt_model, [{"role": "user", "content": combined_input}],
+                                 "streamlit_enhanced_resume", max_completion_tokens=65000)
     except Exception as e:
         raise Exception(f"Error generating resume: {str(e)}")
 # Main Interface
@@ -238,7 +232,7 @@ with col1:
     try:
         with open(GENERATE_RESUME_PROMPT_FILE, "r", encoding='utf-8') as f:
             existing_prompt = f.read()
-    except:
+    except OSError:
         existing_prompt = ""
     generate_resume_prompt = st.text_area(
         "Customize the resume generation prompt:",
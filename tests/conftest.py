@@ -0,0 +1,18 @@
+import os
+
+import pytest
+
+import llm_cache
+import llm_metrics
+
+
+@pytest.fixture(autouse=True)
+def run_in_tmp_path(tmp_path, monkeypatch):
+    """Run every test in its own directory, since the app writes to relative data/, cache/ and resume/ paths"""
+    monkeypatch.chdir(tmp_path)
+    for directory in ("data", "cache", "resume", "prompts"):
+        os.makedirs(directory)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    # Process-wide cache and metrics are created on first use, so each test gets its own under tmp_path
+    monkeypatch.setattr(llm_cache, "_shared_cache", None)
+    monkeypatch.setattr(llm_metrics, "_shared_metrics", None)
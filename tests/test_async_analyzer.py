@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+from cv_analyzer import AsyncCVAnalyzer, CVAnalyzer
+
+CV_TEXT = """Jane Doe
+jane@example.com
+
+Skills
+Python, SQL, Docker
+
+Experience
+Senior Engineer at Acme, 2019-2024. Developed a billing platform.
+
+Education
+BSc Computer Science, 2018
+"""
+
+
+class FakeSyncAnalyzer(CVAnalyzer):
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def create_completion(self, combined_input, max_completion_tokens, site):
+        self.requests.append((site, max_completion_tokens, combined_input))
+        return "streamed answer"
+
+
+class FakeAsyncAnalyzer(AsyncCVAnalyzer):
+    def __init__(self):
+        super().__init__(prompt_cache_warmup_seconds=0)
+        self.requests = []
+
+    async def request_completion(self, messages, max_completion_tokens, *, on_delta=None):
+        self.requests.append(max_completion_tokens)
+        text = "streamed answer"
+        if on_delta:
+            for word in ("streamed ", "answer"):
+                on_delta(word)
+        return text, None, "stop"
+
+
+def write_inputs(tmp_path):
+    cv_path = tmp_path / "cv.txt"
+    cv_path.write_text(CV_TEXT, encoding="utf-8")
+    return str(cv_path)
+
+
+def test_sync_and_async_analyzers_share_prompts_and_result_shape(tmp_path):
+    cv_path = write_inputs(tmp_path)
+    sync_analyzer = FakeSyncAnalyzer()
+    sync_result = sync_analyzer.analyze_cv(cv_path, "sync", verbosity="brief")
+    async_analyzer = FakeAsyncAnalyzer()
+    sent = []
+
+    async def record_inputs(combined_input, max_completion_tokens, site, *, on_delta=None):
+        sent.append((site, max_completion_tokens, combined_input))
+        return await AsyncCVAnalyzer.create_completion(async_analyzer, combined_input, max_completion_tokens, site,
+                                                       on_delta=on_delta)
+
+    async_analyzer.create_completion = record_inputs
+    deltas = []
+    async_result = asyncio.run(async_analyzer.analyze_cv(cv_path, "async", verbosity="brief",
+                                                         on_delta=lambda pass_type, text: deltas.append(pass_type)))
+    assert sync_result.keys() == async_result.keys()
+    assert sync_result["analysis_passes_completed"] == async_result["analysis_passes_completed"]
+    assert sorted(sync_analyzer.requests) == sorted(sent)
+    assert set(deltas) == set(async_result["analysis_passes_completed"])
+    assert async_result["individual_analyses"]["integration_analysis"] == "streamed answer"
+
+
+def test_async_questions_stream_and_save(tmp_path):
+    cv_path = write_inputs(tmp_path)
+    analysis_path = tmp_path / "analysis.txt"
+    analysis_path.write_text("analysis", encoding="utf-8")
+    deltas = []
+    result = asyncio.run(FakeAsyncAnalyzer().generate_questions(
+        cv_path, str(analysis_path), "session", on_delta=lambda site, text: deltas.append((site, text))
+    ))
+    assert result["response"] == "streamed answer"
+    assert deltas == [("questions", "streamed "), ("questions", "answer")]
+    assert (tmp_path / "data" / "session_questions.txt").read_text(encoding="utf-8") == "streamed answer"
+
+
+def test_retried_truncated_answer_replaces_streamed_text(tmp_path):
+    analyzer = FakeAsyncAnalyzer()
+    answers = iter([("cut", "length"), ("full answer", "stop")])
+
+    async def request_completion(messages, max_completion_tokens, *, on_delta=None):
+        text, finish_reason = next(answers)
+        if on_delta:
+            on_delta(text)
+        return text, None, finish_reason
+
+    analyzer.request_completion = request_completion
+    analyzer.completion_budget = lambda site, input_chars, max_completion_tokens: 100
+    events = []
+    text = asyncio.run(analyzer.create_completion("input", 1000, "questions",
+                                                  on_delta=lambda text, replace=False: events.append((text, replace))))
+    assert text == "full answer"
+    assert events == [("cut", False), ("full answer", True)]
+
+
+class SlowFirstTokenAnalyzer(AsyncCVAnalyzer):
+    """Streams its first token after 0.2s; records when each request started"""
+
+    def __init__(self, gpt_model):
+        super().__init__(gpt_model=gpt_model, prompt_cache_warmup_seconds=5)
+        self.started = []
+
+    async def request_completion(self, messages, max_completion_tokens, *, on_delta=None):
+        self.started.append(time.monotonic())
+        await asyncio.sleep(0.2)
+        if on_delta:
+            on_delta("answer")
+        return "answer", None, "stop"
+
+
+def run_two_passes(gpt_model):
+    analyzer = SlowFirstTokenAnalyzer(gpt_model)
+    asyncio.run(analyzer.execute_analysis_passes(CV_TEXT, ["skills_analysis", "experience_analysis"], "session"))
+    return max(analyzer.started) - min(analyzer.started)
+
+
+def test_prompt_cache_warmup_waits_for_the_first_token():
+    assert run_two_passes("gpt-4o") >= 0.2
+
+
+def test_reasoning_models_skip_the_prompt_cache_warmup():
+    assert run_two_passes("o1-mini") < 0.1
+
+
+def test_llm_cache_disk_access_stays_off_the_event_loop():
+    analyzer = FakeAsyncAnalyzer()
+    threads = []
+    get, put = analyzer.llm_cache.get, analyzer.llm_cache.put
+    analyzer.llm_cache.get = lambda *args: threads.append(threading.get_ident()) or get(*args)
+    analyzer.llm_cache.put = lambda *args: threads.append(threading.get_ident()) or put(*args)
+    assert asyncio.run(analyzer.create_completion("input", 1000, "questions")) == "streamed answer"
+    assert len(threads) == 2 and threading.get_ident() not in threads
@@ -0,0 +1,42 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv_analyzer
+from cv_analyzer import CVAnalyzer
+
+CV_TEXT = "Jane Doe\n\nSkills\nPython, SQL\n\nExperience\nSenior Engineer at Acme, 2019-2024.\n"
+PASSES = ["skills_analysis"]
+
+
+def save(analyzer, result="skills result", pass_type="skills_analysis"):
+    analyzer.save_pass_result("session", pass_type, result, analyzer.checkpoint_meta(CV_TEXT, pass_type))
+
+
+def test_checkpoint_is_reused_for_the_same_inputs(tmp_path):
+    analyzer = CVAnalyzer()
+    save(analyzer)
+    assert analyzer.load_checkpoints(CV_TEXT, PASSES, "session") == {"skills_analysis": "skills result"}
+    assert analyzer.load_checkpoints(CV_TEXT + "More", PASSES, "session") == {}
+
+
+def test_checkpoint_records_section_slicing(tmp_path, monkeypatch):
+    analyzer = CVAnalyzer()
+    analyzer.section_slicing = True
+    save(analyzer)
+    assert analyzer.load_checkpoints(CV_TEXT, PASSES, "session")
+    # A different section mapping gives the pass a different excerpt
+    monkeypatch.setitem(cv_analyzer.PASS_SECTIONS, "skills_analysis", ["skills"])
+    assert analyzer.load_checkpoints(CV_TEXT, PASSES, "session") == {}
+    monkeypatch.undo()
+    analyzer.section_slicing = False
+    assert analyzer.load_checkpoints(CV_TEXT, PASSES, "session") == {}
+
+
+def test_concurrent_saves_of_a_pass_do_not_share_temp_files(tmp_path):
+    analyzer = CVAnalyzer()
+    results = [f"result {i}" * 1000 for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda result: save(analyzer, result), results))
+    loaded = analyzer.load_checkpoints(CV_TEXT, PASSES, "session")
+    assert loaded["skills_analysis"] in results
+    assert not [name for name in os.listdir("data") if name.endswith(".tmp")]
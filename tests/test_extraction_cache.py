@@ -0,0 +1,52 @@
+import os
+import shutil
+
+from extraction_cache import ExtractionCache
+
+
+def put_text(cache, digest, text, tmp_path):
+    source = tmp_path / f"{digest}.src"
+    source.write_text(text, encoding="utf-8")
+    cache.put_file(digest, str(source), len(text), 1.5)
+
+
+def test_round_trip_counts_hits_and_misses(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    output = tmp_path / "out.txt"
+    assert cache.get_file("a" * 64, str(output)) is None
+    put_text(cache, "a" * 64, "cleaned text", tmp_path)
+    meta = cache.get_file("a" * 64, str(output))
+    assert meta["characters"] == len("cleaned text")
+    assert output.read_text(encoding="utf-8") == "cleaned text"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["extraction_seconds_saved"] == 1.5
+
+
+def test_evicts_least_recently_used_entry_first(tmp_path):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"), max_bytes=10 ** 9)
+    for i, digest in enumerate(["old", "used", "new"]):
+        put_text(cache, digest, "x" * 1000, tmp_path)
+        os.utime(cache._text_path(cache.make_key(digest)), (1000 + i, 1000 + i))
+    # Reading "old" makes it the most recently used entry
+    assert cache.get_file("old", str(tmp_path / "out.txt")) is not None
+    cache.max_bytes = cache.stats()["bytes"] - 1
+    cache.evict()
+    assert cache.get_file("used", str(tmp_path / "out.txt")) is None
+    assert cache.get_file("old", str(tmp_path / "out.txt")) is not None
+    assert cache.get_file("new", str(tmp_path / "out.txt")) is not None
+    assert not os.path.exists(cache._meta_path(cache.make_key("used")))
+
+
+def test_hit_survives_entry_evicted_after_copy(tmp_path, monkeypatch):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    put_text(cache, "gone", "cleaned text", tmp_path)
+    copyfile = shutil.copyfile
+
+    def copy_then_evict(source, destination):
+        copyfile(source, destination)
+        cache._remove(cache.make_key("gone"))
+
+    monkeypatch.setattr("extraction_cache.shutil.copyfile", copy_then_evict)
+    assert cache.get_file("gone", str(tmp_path / "out.txt")) is not None
+    assert (tmp_path / "out.txt").read_text(encoding="utf-8") == "cleaned text"
@@ -0,0 +1,102 @@
+import asyncio
+from random import Random
+
+import pytest
+
+from cv_analyzer import AsyncCVAnalyzer, is_transient_llm_error
+from llm_metrics import LLM_METRICS_HISTORY, LLMMetrics, shared_llm_metrics
+
+
+class SlowFirstAnalyzer(AsyncCVAnalyzer):
+    """Answers each request after the next delay in delays; records which requests were cancelled"""
+
+    def __init__(self, delays, deadlines=(0.05, 1.0)):
+        super().__init__(prompt_cache_warmup_seconds=0)
+        self.delays = list(delays)
+        self.deadlines = deadlines
+        self.cancelled = []
+
+    def call_deadlines(self, site):
+        return self.deadlines
+
+    async def request_completion(self, messages, max_completion_tokens, *, on_delta=None):
+        attempt = len(self.cancelled)
+        self.cancelled.append(False)
+        try:
+            await asyncio.sleep(self.delays[attempt])
+        except asyncio.CancelledError:
+            self.cancelled[attempt] = True
+            raise
+        return f"answer {attempt}", None, "stop"
+
+
+def run_hedged(analyzer):
+    async def main():
+        result = await analyzer.hedged_completion([{"role": "user", "content": "hi"}], 100, "questions")
+        # Let cancelled requests run their cancellation handlers
+        await asyncio.sleep(0)
+        return result
+    return asyncio.run(main())
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    analyzer = SlowFirstAnalyzer([5.0, 0.01])
+    assert run_hedged(analyzer) == ("answer 1", None, "stop", True)
+    assert analyzer.cancelled == [True, False]
+    totals = shared_llm_metrics().stats()["sites"]["questions"]
+    assert (totals["hedged"], totals["hedge_wins"]) == (1, 1)
+
+
+def test_fast_request_is_not_hedged():
+    analyzer = SlowFirstAnalyzer([0.01])
+    assert run_hedged(analyzer) == ("answer 0", None, "stop", False)
+    assert analyzer.cancelled == [False]
+
+
+def test_hard_deadline_raises_a_transient_timeout_and_cancels_both():
+    analyzer = SlowFirstAnalyzer([5.0, 5.0], deadlines=(0.05, 0.2))
+    with pytest.raises(TimeoutError) as raised:
+        run_hedged(analyzer)
+    assert is_transient_llm_error(raised.value)
+    assert analyzer.cancelled == [True, True]
+    assert shared_llm_metrics().stats()["sites"]["questions"]["timeouts"] == 1
+
+
+def test_hedge_waits_for_a_free_call_slot():
+    analyzer = SlowFirstAnalyzer([0.3, 0.01])
+    analyzer.max_concurrent_calls = 1
+
+    async def main():
+        async with analyzer._get_call_semaphore():
+            return await analyzer.hedged_completion([{"role": "user", "content": "hi"}], 100, "questions")
+    assert asyncio.run(main()) == ("answer 0", None, "stop", False)
+
+
+def test_hedged_calls_count_with_the_primary_elapsed_time():
+    analyzer = SlowFirstAnalyzer([5.0, 0.01])
+    assert asyncio.run(analyzer.create_completion("hi", 100, "questions")) == "answer 1"
+    metrics = shared_llm_metrics()
+    assert [call["hedged"] for call in metrics.recent["questions"]] == [True]
+    # At least the soft deadline (0.05s) the primary ran past
+    assert metrics.latency_quantile("questions", analyzer.gpt_model, 0.95, 1) >= 0.05
+
+
+def test_soft_deadline_stays_stable_as_hedged_calls_are_recorded():
+    metrics = LLMMetrics(log_path=None, quantile_ttl_seconds=0)
+    random = Random(7)
+    for _ in range(LLM_METRICS_HISTORY):
+        metrics.record("analysis", "o1-mini", None, random.lognormvariate(0, 0.4), 100)
+    initial = metrics.latency_quantile("analysis", "o1-mini", 0.95, 20)
+    hedged = 0
+    for _ in range(2000):
+        deadline = metrics.latency_quantile("analysis", "o1-mini", 0.95, 20)
+        latency = random.lognormvariate(0, 0.4)
+        was_hedged = latency > deadline
+        if was_hedged:
+            # The first answer (primary or hedge) ends the call; the primary has run at least the deadline
+            hedged += 1
+            latency = min(latency, deadline + random.lognormvariate(0, 0.4))
+        metrics.record("analysis", "o1-mini", None, latency, 100, hedged=was_hedged)
+    final = metrics.latency_quantile("analysis", "o1-mini", 0.95, 20)
+    assert 0.8 * initial < final < 1.25 * initial
+    assert hedged / 2000 < 0.1
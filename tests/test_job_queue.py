@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from cv_analyzer import is_transient_llm_error
+from job_queue import JobOutput, JobQueue, JobWorkerPool
+
+
+def make_queue(tmp_path, **kwargs):
+    return JobQueue(db_path=str(tmp_path / "jobs.db"), **kwargs)
+
+
+def run_pool(queue, handlers, job_id, timeout=5):
+    """Run a worker pool until job_id leaves the running state; returns its final view"""
+    async def main():
+        pool = JobWorkerPool(queue, handlers, workers=1, is_transient=is_transient_llm_error)
+        pool.start()
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                job = queue.get(job_id)
+                if job["status"] not in ("queued", "running") or (job["status"] == "queued" and job["attempts"]):
+                    return job
+                await asyncio.sleep(0.02)
+            raise AssertionError("job did not finish")
+        finally:
+            await pool.stop()
+    return asyncio.run(main())
+
+
+def test_claim_finish_and_result(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue("analysis", {"cv_path": "cv.txt"}, "s1")
+    job = queue.claim("w1")
+    assert (job["id"], job["payload"]) == (job_id, {"cv_path": "cv.txt"})
+    assert queue.claim("w1") is None
+    queue.finish(job_id, {"success": True})
+    assert queue.get(job_id)["status"] == "done"
+    assert queue.result(job_id) == {"success": True}
+
+
+def test_retry_waits_out_backoff_then_fails_on_last_attempt(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.enqueue("analysis", {})
+    queue.claim("w1")
+    assert queue.retry(job_id, "timed out", backoff_seconds=60)
+    job = queue.get(job_id)
+    assert (job["status"], job["error"]) == ("queued", "timed out")
+    # Still inside the backoff window
+    assert queue.claim("w1") is None
+    queue.execute("UPDATE jobs SET available_at = 0 WHERE id = ?", (job_id,))
+    assert queue.claim("w1")["id"] == job_id
+    assert queue.get(job_id)["attempts"] == 2
+    assert not queue.retry(job_id, "timed out again", backoff_seconds=0)
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_progress_updates_are_written_in_one_transaction(tmp_path):
+    queue = make_queue(tmp_path)
+    first, second = queue.enqueue("analysis", {}), queue.enqueue("analysis", {})
+    queue.claim("w1")
+    queue.report_progress({first: (0.5, "halfway"), second: (0.9, "not running")})
+    assert (queue.get(first)["progress"], queue.get(first)["message"]) == (0.5, "halfway")
+    assert queue.get(second)["progress"] != 0.9
+
+
+def test_pool_retries_transient_errors_and_fails_others(tmp_path):
+    queue = make_queue(tmp_path)
+
+    async def timeout(payload, progress, on_delta):
+        raise Exception("Error in analysis") from TimeoutError("call did not finish")
+
+    async def broken(payload, progress, on_delta):
+        raise ValueError("bad payload")
+
+    transient = queue.enqueue("timeout", {})
+    job = run_pool(queue, {"timeout": timeout}, transient)
+    assert (job["status"], job["attempts"]) == ("queued", 1)
+
+    permanent = queue.enqueue("broken", {})
+    job = run_pool(queue, {"broken": broken}, permanent)
+    assert (job["status"], job["error"]) == ("failed", "bad payload")
+
+
+def test_pool_coalesces_progress_and_keeps_the_latest(tmp_path):
+    queue = make_queue(tmp_path)
+    writes = []
+    report_progress = queue.report_progress
+
+    def record(updates):
+        writes.append(dict(updates))
+        report_progress(updates)
+
+    queue.report_progress = record
+
+    async def chatty(payload, progress, on_delta):
+        for step in range(100):
+            progress.update(step / 100, f"step {step}")
+        await asyncio.sleep(0.1)
+        return {"success": True}
+
+    job_id = queue.enqueue("chatty", {})
+    job = run_pool(queue, {"chatty": chatty}, job_id)
+    assert job["status"] == "done"
+    assert len(writes) == 1
+    assert writes[0][job_id] == (0.99, "step 99")
+
+
+def test_job_output_replays_earlier_events_to_late_listeners():
+    async def main():
+        output = JobOutput()
+        output.publish("skills_analysis", "early ")
+        events, listener = output.subscribe()
+        output.publish("skills_analysis", "final", replace=True)
+        output.finish()
+        return events, [listener.get_nowait() for _ in range(2)]
+
+    events, later = asyncio.run(main())
+    assert events == [("delta", {"pass": "skills_analysis", "text": "early "})]
+    assert later == [("replace", {"pass": "skills_analysis", "text": "final"}), None]
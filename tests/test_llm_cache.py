@@ -0,0 +1,62 @@
+import os
+import time
+
+from llm_cache import LLMCache, completion_key
+
+
+def make_cache(tmp_path, **kwargs):
+    return LLMCache(cache_dir=str(tmp_path / "llm"), memory_entries=0, **kwargs)
+
+
+def test_disk_hit_after_memory_miss_counts_per_site(tmp_path):
+    cache = make_cache(tmp_path)
+    key = completion_key("o1-mini", [{"role": "user", "content": "hi"}])
+    assert cache.get(key, "questions") is None
+    cache.put(key, "answer", "questions", "o1-mini")
+    assert cache.get(key, "questions") == "answer"
+    counters = cache.stats()["sites"]["questions"]
+    assert (counters["disk_hits"], counters["misses"], counters["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_evicts_least_recently_used_entry_first(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10 ** 9)
+    now = time.time()
+    for i, key in enumerate(["old", "used", "new"]):
+        cache.put(key, "x" * 1000)
+        os.utime(cache._path(key), (now - 100 + i, now - 100 + i))
+    # Reading "old" makes it the most recently used entry
+    assert cache.get("old") is not None
+    cache.max_bytes = cache.stats()["bytes"] - 1
+    cache.evict()
+    assert [cache.get(key) is not None for key in ("old", "used", "new")] == [True, False, True]
+
+
+def test_evicts_entries_unused_for_max_age(tmp_path):
+    cache = make_cache(tmp_path, max_age_seconds=3600)
+    cache.put("stale", "text")
+    cache.put("fresh", "text")
+    two_hours_ago = time.time() - 7200
+    os.utime(cache._path("stale"), (two_hours_ago, two_hours_ago))
+    cache.evict()
+    assert not os.path.exists(cache._path("stale"))
+    assert os.path.exists(cache._path("fresh"))
+
+
+def test_hit_survives_entry_evicted_before_touch(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    cache.put("gone", "answer")
+    utime = os.utime
+    monkeypatch.setattr("disk_lru.os.utime", lambda path: cache._remove("gone") or utime(path))
+    assert cache.get("gone") == "answer"
+
+
+def test_writes_rescan_the_store_only_when_it_may_be_full(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_bytes=10 ** 6)
+    scans = []
+    monkeypatch.setattr("llm_cache.cache_entries", lambda *args: scans.append(args) or [])
+    for i in range(5):
+        cache.put(f"key{i}", "x" * 1000)
+    # Only the first write scans; the others add to the estimate
+    assert len(scans) == 1
+    cache.put("big", "x" * 10 ** 6)
+    assert len(scans) == 2
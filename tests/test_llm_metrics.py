@@ -0,0 +1,38 @@
+import json
+
+from llm_metrics import LLMMetrics
+
+
+def test_log_is_written_in_background_and_seeds_the_next_process(tmp_path):
+    log_path = str(tmp_path / "llm_calls.jsonl")
+    metrics = LLMMetrics(log_path=log_path)
+    for seconds in (1.0, 2.0, 3.0):
+        metrics.record("questions", "o1-mini", None, seconds, 100)
+    metrics.flush()
+    with open(log_path, encoding="utf-8") as f:
+        assert [json.loads(line)["seconds"] for line in f] == [1.0, 2.0, 3.0]
+    restarted = LLMMetrics(log_path=log_path)
+    assert restarted.latency_quantile("questions", "o1-mini", 0.5, 3) == 2.0
+
+
+def test_log_rotates_at_max_size_and_keeps_history(tmp_path):
+    log_path = tmp_path / "llm_calls.jsonl"
+    metrics = LLMMetrics(log_path=str(log_path), max_log_bytes=1000)
+    for _ in range(20):
+        metrics.record("questions", "o1-mini", None, 1.0, 100)
+    metrics.flush()
+    assert (tmp_path / "llm_calls.jsonl.1").exists()
+    assert log_path.stat().st_size < 1000 + 300
+    restarted = LLMMetrics(log_path=str(log_path))
+    assert len(restarted.completed_calls("questions", "o1-mini")) > len(log_path.read_text().splitlines())
+
+
+def test_quantiles_are_reused_until_the_ttl_passes(tmp_path):
+    metrics = LLMMetrics(log_path=None, quantile_ttl_seconds=3600)
+    for _ in range(3):
+        metrics.record("questions", "o1-mini", None, 1.0, 100)
+    assert metrics.latency_quantile("questions", "o1-mini", 0.95, 3) == 1.0
+    metrics.record("questions", "o1-mini", None, 9.0, 100)
+    assert metrics.latency_quantile("questions", "o1-mini", 0.95, 3) == 1.0
+    metrics.quantile_ttl_seconds = 0
+    assert metrics.latency_quantile("questions", "o1-mini", 0.95, 3) == 9.0
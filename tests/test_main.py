@@ -0,0 +1,10 @@
+def test_analyzers_are_cached_per_api_key_and_model(monkeypatch):
+    # main creates its working directories on import, so import it inside the test's tmp_path
+    import main
+    monkeypatch.setattr(main, "cv_analyzers", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    mini = main.get_cv_analyzer(model="o1-mini")
+    gpt4o = main.get_cv_analyzer("sk-test", "gpt-4o")
+    assert (mini.gpt_model, gpt4o.gpt_model) == ("o1-mini", "gpt-4o")
+    assert main.get_cv_analyzer("sk-test", "o1-mini") is mini
+    assert main.get_cv_analyzer("sk-other", "o1-mini") is not mini
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from cv_analyzer import CVAnalyzer
+
+CV_TEXT = """Jane Doe
+jane@example.com
+
+Skills
+Python, SQL, Docker
+
+Experience
+Senior Engineer at Acme, 2019-2024. Developed a billing platform.
+
+Projects
+Built an open-source scheduler.
+
+Education
+BSc Computer Science, 2018
+"""
+
+
+class RecordingAnalyzer(CVAnalyzer):
+    """CVAnalyzer whose completions return the call site name, recording concurrency and inputs"""
+
+    def __init__(self):
+        super().__init__(llm_cache=None)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.inputs = {}
+
+    def create_completion(self, combined_input, max_completion_tokens, site):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.inputs[site] = combined_input
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return f"{site} result"
+
+
+def test_independent_passes_run_concurrently_and_integration_sees_them(tmp_path):
+    analyzer = RecordingAnalyzer()
+    cv_path = tmp_path / "cv.txt"
+    cv_path.write_text(CV_TEXT, encoding="utf-8")
+
+    result = analyzer.analyze_cv(str(cv_path), "session")
+
+    passes = ["skills_analysis", "experience_analysis", "projects_analysis", "education_analysis",
+              "integration_analysis"]
+    assert result["analysis_passes_completed"] == passes
+    assert list(result["individual_analyses"]) == passes
+    assert analyzer.max_running > 1
+    for dependency in passes[:-1]:
+        assert f"{dependency} result" in analyzer.inputs["integration_analysis"]
+    assert (tmp_path / "data" / "session_comprehensive_analysis.txt").exists()
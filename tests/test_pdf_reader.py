@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from pdf_reader import PAGE_NUMBER_LINE, clean_and_format_text, iter_tiered_pages, join_hyphenated
+
+SAMPLE_CV = os.path.join(os.path.dirname(__file__), "fixtures", "sample_cv.pdf")
+# A ruled skills table in the left column with a LANGUAGES sidebar beside it
+SIDEBAR_CV = os.path.join(os.path.dirname(__file__), "fixtures", "sidebar_cv.pdf")
+
+
+@pytest.mark.parametrize("line", ["Page 3", "page 3 of 7", "Page 3/7", "3 of 7", "- 3 -"])
+def test_page_number_lines_are_recognised(line):
+    assert PAGE_NUMBER_LINE.match(line)
+
+
+@pytest.mark.parametrize("line", ["2019/2020", "06/2021", "3/7", "2019 - 2020", "12"])
+def test_date_lines_are_not_page_numbers(line):
+    assert not PAGE_NUMBER_LINE.match(line)
+
+
+def test_join_hyphenated_keeps_the_hyphen():
+    lines = ["Leads cross-", "functional teams and self-", "directed squads.", "Co-", "Founder"]
+    assert list(join_hyphenated(lines)) == [
+        "Leads cross-functional teams and self-directed squads.", "Co-", "Founder"
+    ]
+
+
+def test_clean_text_of_sample_cv_keeps_dates_and_hyphens():
+    text = clean_and_format_text("".join(iter_tiered_pages(SAMPLE_CV)))
+    lines = text.splitlines()
+    assert "Backend engineer who leads cross-functional teams building payment platforms." in lines
+    assert "06/2021 - Present" in lines
+    assert "2019/2020" in lines
+    assert not any(PAGE_NUMBER_LINE.match(line) or line.startswith("--- Page") for line in lines)
+
+
+def test_text_beside_a_table_is_kept_once():
+    lines = clean_and_format_text("".join(iter_tiered_pages(SIDEBAR_CV))).splitlines()
+    for line in ["LANGUAGES", "English - native", "German - fluent", "Python\t7", "Terraform\t2"]:
+        assert lines.count(line) == 1
+    # Sidebar text comes with the text above the table, and the table before the next section
+    assert lines.index("TECHNICAL SKILLS") < lines.index("German - fluent") < lines.index("Table 1 from page 1:")
+    assert lines.index("Terraform\t2") < lines.index("WORK EXPERIENCE")
+
+
+def test_dated_lines_at_page_edges_are_not_running_headers():
+    pages = [
+        ["Jane Doe | Page 1 of 3", "WORK EXPERIENCE", "Acme Payments", "Shipped billing",
+         "Software Engineer 2019 - 2021"],
+        ["Jane Doe | Page 2 of 3", "Software Engineer 2016 - 2019", "Beta Labs", "Built APIs", "Analyst 2014 - 2016"],
+        ["Jane Doe | Page 3 of 3", "Software Engineer 2014 - 2016", "Gamma Ltd", "EDUCATION", "BSc 2010 - 2014"],
+    ]
+    text = "".join(f"\n--- Page {i} ---\n" + "\n".join(lines) + "\n" for i, lines in enumerate(pages, 1))
+    lines = clean_and_format_text(text).splitlines()
+    for dated in ["Software Engineer 2019 - 2021", "Software Engineer 2016 - 2019", "Software Engineer 2014 - 2016",
+                  "Analyst 2014 - 2016", "BSc 2010 - 2014"]:
+        assert dated in lines
+    # The running header with its page number is still removed after the first page
+    assert [line for line in lines if line.startswith("Jane Doe")] == ["Jane Doe | Page 1 of 3"]
@@ -0,0 +1,53 @@
+import os
+import signal
+import time
+
+import pytest
+
+from pdf_sandbox import _receive, extract_sandboxed
+
+SAMPLE_CV = os.path.join(os.path.dirname(__file__), "fixtures", "sample_cv.pdf")
+
+
+class ClosedPipe:
+    def poll(self, timeout):
+        return True
+
+    def recv(self):
+        raise EOFError
+
+
+class ExitedProcess:
+    def __init__(self, exitcode):
+        self.exitcode = exitcode
+
+    def join(self):
+        pass
+
+
+@pytest.mark.parametrize("exitcode, message", [
+    (0, ("exit", None)),
+    (-signal.SIGXCPU, ("limit", "cpu_limit")),
+    (-signal.SIGKILL, ("limit", "killed")),
+    (-signal.SIGSEGV, ("limit", f"exit_{-signal.SIGSEGV}")),
+])
+def test_receive_names_how_the_child_exited(exitcode, message):
+    assert _receive(ClosedPipe(), ExitedProcess(exitcode), time.monotonic() + 5) == message
+
+
+def test_sandbox_extracts_pdf_from_path_and_bytes(tmp_path):
+    with open(SAMPLE_CV, "rb") as f:
+        content = f.read()
+    for source in (SAMPLE_CV, content):
+        output_path = tmp_path / "cv.txt"
+        extraction = extract_sandboxed(source, str(output_path))
+        assert extraction["truncated"] is None
+        assert extraction["pages"] == 2
+        assert extraction["characters"] == len(output_path.read_text(encoding="utf-8"))
+        assert "Senior Backend Engineer, Acme Payments" in output_path.read_text(encoding="utf-8")
+
+
+def test_sandbox_uses_inspection_passed_by_caller(tmp_path):
+    extraction = extract_sandboxed(SAMPLE_CV, str(tmp_path / "cv.txt"),
+                                   inspection={"pages": 2, "text_layer": False})
+    assert extraction["no_text_layer"]
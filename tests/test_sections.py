@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from cv_analyzer import PASS_SECTIONS, cv_excerpt, segment_cv
+from pdf_reader import clean_and_format_text, iter_tiered_pages
+
+SAMPLE_CV = os.path.join(os.path.dirname(__file__), "fixtures", "sample_cv.pdf")
+
+
+@pytest.fixture(scope="module")
+def cv_text():
+    return clean_and_format_text("".join(iter_tiered_pages(SAMPLE_CV)))
+
+
+def section_text(cv_text, name):
+    return "\n".join(cv_text[start:end] for section, start, end in segment_cv(cv_text) if section == name)
+
+
+def test_table_stays_in_the_section_it_sits_in(cv_text):
+    skills = section_text(cv_text, "skills")
+    assert "Python\t8\tExpert" in skills
+    assert "Kubernetes\t4\tIntermediate" in skills
+    assert "Table 1 from page 1:" not in section_text(cv_text, "experience")
+
+
+def test_sections_of_sample_cv(cv_text):
+    assert [name for name, _, _ in segment_cv(cv_text)] == [
+        "header", "summary", "skills", "experience", "projects", "education", "certifications"
+    ]
+    experience = section_text(cv_text, "experience")
+    assert "06/2021 - Present" in experience
+    assert "2019/2020" in experience
+    assert "Page 1 of 2" not in cv_text
+
+
+@pytest.mark.parametrize("pass_type, expected, omitted", [
+    ("skills_analysis", ["Python\t8\tExpert", "Acme Payments", "Ledger Sync", "BSc Computer Science"],
+     ["AWS Certified"]),
+    ("experience_analysis", ["Acme Payments", "2019/2020", "PostgreSQL\t6\tAdvanced", "2012 - 2016"],
+     ["Ledger Sync", "AWS Certified"]),
+    ("projects_analysis", ["Ledger Sync", "Kubernetes\t4\tIntermediate"], ["Acme Payments", "AWS Certified"]),
+    ("education_analysis", ["BSc Computer Science", "AWS Certified", "Beta Labs"], ["Ledger Sync"]),
+])
+def test_pass_excerpts_hold_the_sections_their_prompts_cross_reference(cv_text, pass_type, expected, omitted):
+    excerpt = cv_excerpt(cv_text, segment_cv(cv_text), pass_type)
+    assert excerpt.startswith("Jane Doe")
+    for text in expected:
+        assert text in excerpt
+    for text in omitted:
+        assert text not in excerpt
+
+
+def test_integration_pass_gets_the_whole_cv(cv_text):
+    assert "integration_analysis" not in PASS_SECTIONS
+    assert cv_excerpt(cv_text, segment_cv(cv_text), "integration_analysis") == cv_text
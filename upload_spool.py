@@ -0,0 +1,126 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from fastapi import HTTPException
+
+# Upload ingestion configuration
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+UPLOAD_SPOOL_MEMORY_MB = float(os.getenv("UPLOAD_SPOOL_MEMORY_MB", "1"))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the per-request size limit"""
+
+
+class SpooledUpload:
+    """Upload body kept in memory up to memory_limit bytes, then rolled over to a temp file
+
+    The SHA-256 digest is computed as chunks arrive, and writing past max_bytes
+    raises UploadTooLargeError.
+    """
+
+    def __init__(self, max_bytes, memory_limit):
+        self.max_bytes = max_bytes
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.path = None
+        self._hash = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit")
+        self._hash.update(chunk)
+        if self._file is None and self.size > self.memory_limit:
+            # Roll over: move what is buffered so far to disk and keep writing there
+            self._file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+            self.path = self._file.name
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer.write(chunk)
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()
+
+    def source(self):
+        """Extractor input: the in-memory bytes, or the temp file path once rolled over"""
+        if self._file is not None:
+            self._file.close()
+            return self.path
+        return self._buffer.getvalue()
+
+    def close(self):
+        """Release the buffer and remove the temp file, if any"""
+        if self._file is not None:
+            self._file.close()
+            os.unlink(self.path)
+            self._file = None
+        self._buffer = None
+
+
+async def spool_upload(upload, max_bytes=int(MAX_UPLOAD_MB * 1024 * 1024),
+                       memory_limit=int(UPLOAD_SPOOL_MEMORY_MB * 1024 * 1024)):
+    """Read a FastAPI UploadFile in chunks into a SpooledUpload"""
+    spooled = SpooledUpload(max_bytes, memory_limit)
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized request bodies on upload paths before they are parsed
+
+    Declared Content-Length is checked up front; chunked bodies are counted as
+    they are received and cut off once they pass the limit.
+    """
+
+    def __init__(self, app, paths, max_bytes=int(MAX_UPLOAD_MB * 1024 * 1024)):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Upload exceeds the {(self.max_body_bytes - MULTIPART_OVERHEAD_BYTES) // (1024 * 1024)} MB limit"
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json")]
+            })
+            await send({"type": "http.response.body", "body": b'{"detail": "%s"}' % detail.encode()})
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)